@@ -11,3 +11,6 @@ pip install wheel
 
 # install the packages needed by smartbugs
 pip install pyyaml colorama requests semantic_version docker py-cpuinfo
+
+# optional: faster reading and writing of json files
+pip install orjson
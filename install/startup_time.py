@@ -0,0 +1,36 @@
+#!/usr/bin/env python
+
+# Measures the startup time of the SmartBugs commands,
+# on a minimal results folder that needs no work.
+# Usage: install/startup_time.py [RUNS]
+
+import os, sys, subprocess, tempfile, time, json
+
+SB = os.path.abspath(os.path.join(os.path.dirname(__file__), os.pardir))
+RUNS = int(sys.argv[1]) if len(sys.argv) > 1 else 5
+
+with tempfile.TemporaryDirectory() as results:
+    rdir = os.path.join(results, "tool", "run", "file.sol")
+    os.makedirs(rdir)
+    with open(os.path.join(rdir, "smartbugs.json"), "w") as f:
+        json.dump({"filename": "file.sol", "runid": "run", "tool": {"id": "tool", "mode": "solidity"},
+            "result": {"start": 0, "duration": 0, "exit_code": 0}}, f)
+    with open(os.path.join(rdir, "result.json"), "w") as f:
+        json.dump({"findings": [], "infos": [], "errors": [], "fails": [],
+            "parser": {"id": "tool", "mode": "solidity", "version": "0"}}, f)
+
+    commands = {
+        "smartbugs --version": ["-m", "sb", "--version"],
+        "reparse": ["-m", "sb.reparse", results],
+        "results2csv": ["-m", "sb.results2csv", results],
+    }
+
+    env = dict(os.environ, PYTHONPATH=SB)
+    for name,args in commands.items():
+        best = None
+        for _ in range(RUNS):
+            start = time.time()
+            subprocess.run([sys.executable] + args, env=env, stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL)
+            duration = time.time() - start
+            best = duration if best is None else min(best, duration)
+        print(f"{name:20} {best:.2f}s (best of {RUNS})")
@@ -1,27 +1,54 @@
-import multiprocessing, random, time, datetime, os, random
-import sb.logging, sb.colors, sb.docker, sb.cfg, sb.io, sb.parsing, sb.sarif, sb.errors
+import multiprocessing, random, time, datetime, os, random, copy
+import sb.logging, sb.colors, sb.docker, sb.cfg, sb.tasks, sb.scheduler, sb.autoscale, sb.io, sb.index, sb.db, sb.parsing, sb.parse_utils, sb.sarif, sb.utils, sb.errors, sb.registry
 
 
 
-def task_log_dict(task, start_time, duration, exit_code, log, output, docker_args):
+def task_log_dict(task, start_time, duration, exit_code, oom_killed, log, output, docker_args, timings, resources):
     return {
         "filename": task.relfn,
+        "contract": task.contract,
         "runid": task.settings.runid,
         "result": {
             "start": start_time,
             "duration": duration,
             "exit_code": exit_code,
+            "oom_killed": oom_killed,
             "logs": sb.cfg.TOOL_LOG if log else None,
-            "output": sb.cfg.TOOL_OUTPUT if output else None},
+            "output": sb.cfg.TOOL_OUTPUT if output else None,
+            "precheck": task.precheck_fail},
         "solc": str(task.solc_version) if task.solc_version else None,
         "tool": task.tool.dict(),
         "docker": docker_args,
-        "platform": sb.cfg.PLATFORM,
+        "timings": timings,
+        "resources": resources,
+        "platform": sb.cfg.platform_info(),
     }
 
 
 
-def execute(task):
+def oom_retry(task, task_log, budget):
+    """A copy of task with twice the memory limit, if the container ran out of memory
+    and the task can be retried within the memory budget; otherwise None."""
+    result = task_log["result"]
+    oom_killed = result["oom_killed"]
+    if oom_killed is None:
+        # unknown, e.g. if the container is gone; Docker reports a kill by the OOM killer as exit code 137
+        oom_killed = result["exit_code"] == 137
+    # tasks are retried only once, and only with a limit to raise
+    if not budget or not oom_killed or task.mem_limit:
+        return None
+    mem_limit = sb.utils.mem2bytes(sb.docker.mem_limit(task))
+    if not mem_limit or mem_limit >= budget.budget:
+        return None
+    retry = copy.copy(task)
+    retry.mem_limit = min(2*mem_limit, budget.budget)
+    return retry
+
+
+
+def execute(task, parsequeue, budget=None):
+    """Run task, unless there is a result already; return the duration,
+    and a task to re-queue if the container ran out of memory."""
 
     # create result dir if it doesn't exist
     os.makedirs(task.rdir, exist_ok=True)
@@ -36,12 +63,15 @@ def execute(task):
         old_fn = old["filename"]
         old_toolid = old["tool"]["id"]
         old_mode = old["tool"]["mode"]
-        if task.relfn != old_fn or task.tool.id != old_toolid or task.tool.mode != old_mode:
+        old_contract = old.get("contract")
+        if (task.relfn != old_fn or task.tool.id != old_toolid or task.tool.mode != old_mode
+                or task.contract != old_contract):
             raise sb.errors.SmartBugsError(
                 f"Result directory {task.rdir} occupied by another task"
-                f" ({old_toolid}/{old_mode}, {old_fn})")
-        if not task.settings.overwrite:
-            return 0.0
+                f" ({old_toolid}/{old_mode}, {old_fn}{':'+old_contract if old_contract else ''})")
+        # tasks retried after running out of memory replace their first result
+        if not task.settings.overwrite and not task.mem_limit:
+            return 0.0, None
 
     # remove any leftovers from a previous analysis
     fn_tool_log = os.path.join(task.rdir, sb.cfg.TOOL_LOG)
@@ -56,54 +86,145 @@ def execute(task):
         if os.path.exists(fn):
             raise sb.errors.SmartBugsError(f"Cannot clear old output {fn}")
 
+    # tasks with unusable input fail without running the tool,
+    # the synthetic result is always written, to record the reason
+    if task.precheck_fail:
+        task_log = task_log_dict(task, time.time(), 0.0, None, None, None, None, None, None, None)
+        sb.io.write_json(fn_task_log, task_log)
+        parsed_result = sb.parsing.parse(task_log, [], None)
+        parsed_result["inputs"] = sb.parsing.fingerprint(task.rdir)
+        sb.io.write_json(fn_parser_output, parsed_result)
+        if task.settings.sarif:
+            sarif_result = sb.sarif.sarify(task_log["tool"], parsed_result["findings"])
+            sb.io.write_json(fn_sarif_output, sarif_result)
+        return 0.0, None
+
     # perform analysis
     # Docker causes spurious connection errors
     # try three times before giving up
+    # the memory limit of the container is reserved from the budget for each attempt,
+    # not while waiting between attempts
+    reserved = (sb.utils.mem2bytes(sb.docker.mem_limit(task)) or 0) if budget else 0
+    timings_budget, timings_retry = 0.0, 0.0
     for i in range(3):
+        if budget:
+            budget_start_time = time.time()
+            budget.reserve(reserved)
+            timings_budget += time.time() - budget_start_time
+        start_time = time.time()
         try:
-            start_time = time.time()
-            exit_code,tool_log,tool_output,docker_args = sb.docker.execute(task)
+            exit_code,tool_log,tool_output,docker_args,timings,resources,oom_killed = sb.docker.execute(task)
             duration = time.time() - start_time
             break
         except sb.errors.SmartBugsError as e:
             if i == 2:
                 raise
+        finally:
+            if budget:
+                budget.release(reserved)
         # wait 3 to 8 minutes
         time.sleep(random.randint(3,8)*60)
+        timings_retry += time.time() - start_time
+
+    # time spent waiting for memory, and in failed attempts, including the waiting
+    timings["budget"] = timings_budget
+    timings["retry"] = timings_retry
 
     # write result to files
-    task_log = task_log_dict(task, start_time, duration, exit_code, tool_log, tool_output, docker_args)
+    write_start_time = time.time()
     if tool_log:
         sb.io.write_txt(fn_tool_log, tool_log)
     if tool_output:
         sb.io.write_bin(fn_tool_output, tool_output)
+    timings["write"] = time.time() - write_start_time
+    task_log = task_log_dict(task, start_time, duration, exit_code, oom_killed, tool_log, tool_output, docker_args, timings, resources)
 
     # Write fn_task_log, to indicate that this task is done
     sb.io.write_json(fn_task_log, task_log)
-        
-    # Parse output of tool
+
+    # a task that ran out of memory may get a second chance, its first result is not parsed
+    retry = oom_retry(task, task_log, budget)
+
+    # Parse output of tool in a separate process, to free the slot for the next container
     # If parsing fails, run the reparse script; no need to redo the analysis
-    if task.settings.json or task.settings.sarif:
-        parsed_result = sb.parsing.parse(task_log, tool_log, tool_output)
-        sb.io.write_json(fn_parser_output,parsed_result)
+    if not retry and (task.settings.json or task.settings.sarif or task.settings.merged_sarif):
+        parsequeue.put(task.rdir)
 
-        # Format parsed result as sarif
-        if task.settings.sarif:
-            sarif_result = sb.sarif.sarify(task_log["tool"], parsed_result["findings"])
-            sb.io.write_json(fn_sarif_output, sarif_result)
+    return duration, retry
+
+
+
+def parse(rdir, sarif):
+    fn_task_log = os.path.join(rdir, sb.cfg.TASK_LOG)
+    fn_tool_log = os.path.join(rdir, sb.cfg.TOOL_LOG)
+    fn_tool_output = os.path.join(rdir, sb.cfg.TOOL_OUTPUT)
+    fn_parser_output = os.path.join(rdir, sb.cfg.PARSER_OUTPUT)
+    fn_sarif_output = os.path.join(rdir, sb.cfg.SARIF_OUTPUT)
 
-    return duration
+    inputs = sb.parsing.fingerprint(rdir)
+    task_log = sb.io.read_json(fn_task_log)
+    parse_start_time = time.time()
+    tool_log = sb.parse_utils.LogLines(fn_tool_log if task_log["result"]["logs"] else None)
+    tool_output = sb.parse_utils.Archive(fn_tool_output if task_log["result"]["output"] else None)
 
+    parsed_result = sb.parsing.parse(task_log, tool_log, tool_output)
+    parsed_result["inputs"] = inputs
+    parsed_result["timings"] = { "parse": time.time() - parse_start_time }
+    sb.io.write_json(fn_parser_output,parsed_result)
 
+    # Format parsed result as sarif
+    if sarif:
+        sarif_result = sb.sarif.sarify(task_log["tool"], parsed_result["findings"])
+        sb.io.write_json(fn_sarif_output, sarif_result)
 
-def analyser(logqueue, taskqueue, tasks_total, tasks_started, tasks_completed, time_completed):
+    return task_log, parsed_result
+
+
+
+def parser(logqueue, parsequeue, dbqueue, sarifqueue, sarif, compact_json):
+    sb.io.compact = compact_json
+    while True:
+        rdir = parsequeue.get()
+        if rdir is None:
+            return
+        try:
+            task_log,parsed_result = parse(rdir, sarif)
+            if dbqueue:
+                dbqueue.put(("parsed", rdir, parsed_result))
+            if sarifqueue:
+                sarifqueue.put((task_log["tool"], parsed_result["findings"]))
+        except Exception as e:
+            # keep the parser alive, the results can be reparsed later on
+            sb.logging.message(sb.colors.error(f"While parsing the results in {rdir}:\n{e}"), "", logqueue)
+
+
+
+def to_db(rdir, dbqueue):
+    """Send the task log and, if already present, the parsed result in rdir to the database."""
+    fn_task_log = os.path.join(rdir, sb.cfg.TASK_LOG)
+    fn_parser_output = os.path.join(rdir, sb.cfg.PARSER_OUTPUT)
+    if os.path.exists(fn_task_log):
+        dbqueue.put(("task", rdir, sb.io.read_json(fn_task_log)))
+    # parsed results of new tasks are sent by the parsers, except for failed prechecks
+    if os.path.exists(fn_parser_output):
+        dbqueue.put(("parsed", rdir, sb.io.read_json(fn_parser_output)))
+
+
+
+def analyser(logqueue, taskqueue, feedback, parsequeue, indexqueue, dbqueue, index_root, platform, tools, settings, slots, docker_api, budget, tasks_total, tasks_started, tasks_completed, time_completed):
+    # determined once by the main process
+    sb.cfg.PLATFORM = platform
+    # tasks refer to the tools and settings received once here
+    sb.tasks.init(tools, settings)
+    # when autoscaling, a task may only be taken with a slot, and Docker is monitored
+    sb.docker.api_stats = docker_api
         
     def pre_analysis():
         with tasks_started.get_lock():
             tasks_started_value = tasks_started.value + 1
             tasks_started.value = tasks_started_value
         sb.logging.message(
-            f"Starting task {tasks_started_value}/{tasks_total}: {sb.colors.tool(task.tool.id)} and {sb.colors.file(task.relfn)}",
+            f"Starting task {tasks_started_value}/{tasks_total.value}: {sb.colors.tool(task.tool.id)} and {sb.colors.file(task.relfn)}{':'+task.contract if task.contract else ''}",
             "", logqueue)
 
     def post_analysis(duration, no_processes, timeout):
@@ -115,7 +236,7 @@ def analyser(logqueue, taskqueue, tasks_total, tasks_started, tasks_completed, t
         # estimated time to completion = time_so_far / completed_tasks * remaining_tasks / no_processes
         completed_tasks = tasks_completed_value
         time_so_far = time_completed_value
-        remaining_tasks = tasks_total - tasks_completed_value
+        remaining_tasks = tasks_total.value - tasks_completed_value
         if timeout:
             # Assume that the first round of processes all ran into a timeout
             completed_tasks += no_processes
@@ -123,20 +244,50 @@ def analyser(logqueue, taskqueue, tasks_total, tasks_started, tasks_completed, t
         etc = time_so_far / completed_tasks * remaining_tasks / no_processes
         etc_fmt = datetime.timedelta(seconds=round(etc))
         duration_fmt = datetime.timedelta(seconds=round(duration))
-        sb.logging.message(f"{tasks_completed_value}/{tasks_total} completed, ETC {etc_fmt}")
+        sb.logging.message(f"{tasks_completed_value}/{tasks_total.value} completed, ETC {etc_fmt}")
 
     while True:
+        if slots:
+            slots.acquire()
         task = taskqueue.get()
         if task is None:
+            if slots:
+                slots.release()
             return
-        sb.logging.quiet = task.settings.quiet
-        pre_analysis()
+        # the scheduler and the other analysers wait for the report and the slot,
+        # so they are returned even if the analysis fails unexpectedly
+        retry = None
         try:
-            duration = execute(task)
-        except sb.errors.SmartBugsError as e:
-            duration = 0.0
-            sb.logging.message(sb.colors.error(f"While analyzing {task.absfn} with {task.tool.id}:\n{e}"), "", logqueue)
-        post_analysis(duration, task.settings.processes, task.settings.timeout)
+            sb.logging.quiet = task.settings.quiet
+            sb.io.compact = task.settings.compact_json
+            pre_analysis()
+            try:
+                duration,retry = execute(task, parsequeue, budget)
+            except sb.errors.SmartBugsError as e:
+                duration,retry = 0.0,None
+                sb.logging.message(sb.colors.error(f"While analyzing {task.absfn} with {task.tool.id}:\n{e}"), "", logqueue)
+            if indexqueue:
+                entry = sb.index.record(task.rdir, index_root)
+                if entry:
+                    indexqueue.put(entry)
+            if dbqueue:
+                try:
+                    to_db(task.rdir, dbqueue)
+                except sb.errors.SmartBugsError as e:
+                    sb.logging.message(sb.colors.error(f"While recording the results in {task.rdir}:\n{e}"), "", logqueue)
+            if retry:
+                with tasks_total.get_lock():
+                    tasks_total.value += 1
+                sb.logging.message(
+                    f"Task ran out of memory, retrying with limit {sb.utils.bytes2mem(retry.mem_limit)}: {sb.colors.tool(task.tool.id)} and {sb.colors.file(task.relfn)}{':'+task.contract if task.contract else ''}",
+                    "", logqueue)
+            post_analysis(duration, task.settings.processes, task.settings.timeout)
+        finally:
+            if feedback:
+                # retries go first, their memory demand is known to be high
+                feedback.put((retry, -1))
+            if slots:
+                slots.release()
 
 
 
@@ -150,29 +301,103 @@ def run(tasks, settings):
     try:
         start_time = time.time()
 
-        # fill task queue
-        taskqueue = mp.Queue()
+        # the analysers receive the tools and settings once, the tasks only refer to them;
+        # the main process needs them as well, to unpickle the tasks reported back for a retry
+        tools = list({ (task.tool.id, task.tool.mode): task.tool for task in tasks }.values())
+        sb.tasks.init(tools, settings)
+
+        # the tasks wait in the backlog of the scheduler, which keeps
+        # a small queue topped up, with about one spare task per analyser
+        taskqueue = mp.Queue(settings.processes)
+        # with a memory budget, tasks that ran out of memory are reported back for a retry
+        budget = sb.scheduler.MemoryBudget(mp, sb.utils.mem2bytes(settings.mem_budget)) if settings.mem_budget else None
+        feedback = mp.Queue() if budget else None
+        scheduler = sb.scheduler.Scheduler(taskqueue, settings.processes, feedback)
         random.shuffle(tasks)
         for task in tasks:
-            taskqueue.put(task)
-        for _ in range(settings.processes):
-            taskqueue.put(None)
+            scheduler.add(task)
 
         # accounting
-        tasks_total = len(tasks)
+        tasks_total = mp.Value('L', len(tasks))
         tasks_started = mp.Value('L', 0)
         tasks_completed = mp.Value('L', 0)
         time_completed = mp.Value('f', 0.0)
 
+        # the database is written in batches by a thread of the main process
+        dbqueue = mp.Queue() if settings.db else None
+        if dbqueue:
+            sb.db.start(settings.db, dbqueue, logqueue, scheduler.cancel)
+
+        # the merged sarif file is written by a thread of the main process
+        sarifqueue = mp.Queue() if settings.merged_sarif else None
+        if sarifqueue:
+            sb.sarif.start(settings.merged_sarif, sarifqueue)
+
+        # start parsers, decoupled from the analysers to keep the Docker slots busy
+        parsequeue = mp.Queue()
+        no_parsers = settings.parsers if settings.json or settings.sarif or settings.merged_sarif else 0
+        if no_parsers:
+            # parsing fails for each task of these tools; they are run nevertheless
+            for msg in sb.registry.check(tools):
+                sb.logging.message(sb.colors.warning(f"{msg}\nThe results of this tool will not be parsed."), "", logqueue)
+        # the parsers are forked from a process with all parsers preloaded, where possible
+        mp_parsers = sb.parsing.context()
+        parsers = [ mp_parsers.Process(target=parser, args=(logqueue, parsequeue, dbqueue, sarifqueue, settings.sarif, settings.compact_json)) for _ in range(no_parsers) ]
+        for p in parsers:
+            p.start()
+
+        # the index of the result directories is written by a thread of the main process
+        index_root = sb.index.root(settings.results.template)
+        indexqueue = mp.Queue() if index_root else None
+        if indexqueue:
+            sb.index.start(index_root, settings.runid, indexqueue)
+
+        # with autoscaling, the controller decides how many of the analysers are active
+        if settings.min_processes and settings.min_processes < settings.processes:
+            slots = sb.autoscale.Slots(mp, settings.processes)
+            docker_api = mp.Array('d', 3)
+            controller = sb.autoscale.Controller(slots, docker_api, settings.min_processes, settings.processes, scheduler, logqueue)
+            controller.start()
+        else:
+            slots,docker_api,controller = None,None,None
+
         # start analysers
-        shared = (logqueue, taskqueue, tasks_total, tasks_started, tasks_completed, time_completed)
+        shared = (logqueue, taskqueue, feedback, parsequeue, indexqueue, dbqueue, index_root, sb.cfg.platform_info(), tools, settings, slots, docker_api, budget, tasks_total, tasks_started, tasks_completed, time_completed)
         analysers = [ mp.Process(target=analyser, args=shared) for _ in range(settings.processes) ]
         for a in analysers:
             a.start()
+        scheduler.start()
 
         # wait for analysers to finish
-        for a in analysers:
-            a.join()
+        try:
+            for a in analysers:
+                a.join()
+        except KeyboardInterrupt:
+            cancelled = scheduler.cancel()
+            sb.logging.message(sb.colors.warning(f"Interrupted, {cancelled} task(s) not started"), "", logqueue)
+            taskqueue.cancel_join_thread()
+            raise
+        scheduler.join()
+        if controller:
+            controller.stop()
+
+        # wait for parsers to finish
+        for _ in parsers:
+            parsequeue.put(None)
+        for p in parsers:
+            p.join()
+
+        if indexqueue:
+            sb.index.stop(indexqueue)
+
+        if dbqueue:
+            sb.db.stop(dbqueue)
+
+        if sarifqueue:
+            sb.sarif.stop(sarifqueue)
+
+        if dbqueue and sb.db.error:
+            raise sb.errors.SmartBugsError(f"Writing to the database {settings.db} failed, results are missing\n{sb.db.error}")
 
         # good bye
         duration = datetime.timedelta(seconds=round(time.time()-start_time))
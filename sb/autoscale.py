@@ -0,0 +1,159 @@
+"""Adaptive number of active analysers, between min_processes and processes.
+
+All analysers are started, but each one needs one of the shared Slots to
+take a task. A thread of the main process, the controller, lowers the limit
+of the slots when the host or Docker is under stress, and raises it again
+once the load has gone down: one slot more per interval while all signals
+are low, one slot less when one of them is high, and half of the slots
+when Docker calls fail. A lower limit takes effect at once for new tasks,
+running tasks are not interrupted. The run starts with all slots, as given
+by --processes. Each change is logged, with the signals it was based on.
+
+Signals:
+- cpu: share of time some runnable tasks waited for a CPU (pressure stall
+  information), or the load average per CPU where PSI is not available
+- memory: share of the memory in use, by the host or our cgroup, whichever is higher
+- docker: average duration and number of failures of the Docker API calls of
+  the analysers, see sb.docker.api_stats
+"""
+
+import os, threading
+import sb.logging
+
+INTERVAL = 10 # [s] between two decisions
+
+# thresholds for reducing (HIGH) and increasing (LOW) the number of active analysers
+CPU_HIGH, CPU_LOW = 40.0, 10.0         # [%] of time stalled
+MEMORY_HIGH, MEMORY_LOW = 90.0, 75.0   # [%] in use
+LATENCY_HIGH, LATENCY_LOW = 5.0, 1.0   # [s] per Docker API call
+
+
+
+def read_file(fn):
+    try:
+        with open(fn) as f:
+            return f.read()
+    except OSError:
+        return None
+
+
+def cpu_pressure():
+    psi = read_file("/proc/pressure/cpu")
+    if psi:
+        try:
+            some = psi.splitlines()[0].split()
+            return float(some[1].split("=")[1])
+        except (IndexError, ValueError):
+            pass
+    try:
+        return 100.0 * os.getloadavg()[0] / (os.cpu_count() or 1)
+    except OSError:
+        return None
+
+
+def memory_usage():
+    usages = []
+    meminfo = read_file("/proc/meminfo")
+    if meminfo:
+        info = {}
+        for line in meminfo.splitlines():
+            k,_,v = line.partition(":")
+            info[k] = v.split()[0] if v.split() else None
+        try:
+            usages.append(100.0 * (1 - int(info["MemAvailable"]) / int(info["MemTotal"])))
+        except (KeyError, TypeError, ValueError, ZeroDivisionError):
+            pass
+    current = read_file("/sys/fs/cgroup/memory.current") # cgroup v2
+    limit = read_file("/sys/fs/cgroup/memory.max")
+    if current and limit and limit.strip() != "max":
+        try:
+            usages.append(100.0 * int(current) / int(limit))
+        except (ValueError, ZeroDivisionError):
+            pass
+    return max(usages) if usages else None
+
+
+
+class Slots:
+    """Number of analysers running a task, and its limit, shared by the processes."""
+
+    def __init__(self, mp, limit):
+        self.busy = mp.Value('i', 0, lock=False)      # protected by self.changed
+        self.limit = mp.Value('i', limit, lock=False) # protected by self.changed
+        self.changed = mp.Condition()
+
+    def acquire(self):
+        with self.changed:
+            while self.busy.value >= self.limit.value:
+                self.changed.wait()
+            self.busy.value += 1
+
+    def release(self):
+        with self.changed:
+            self.busy.value -= 1
+            self.changed.notify_all()
+
+    def set_limit(self, limit):
+        with self.changed:
+            self.limit.value = limit
+            self.changed.notify_all()
+
+
+
+class Controller:
+
+    def __init__(self, slots, docker_api, min_active, max_active, scheduler, logqueue):
+        self.slots = slots           # shared with the analysers
+        self.docker_api = docker_api # shared array: calls, failures, seconds
+        self.min_active = min_active
+        self.max_active = max_active
+        self.scheduler = scheduler   # more analysers only help while tasks are waiting
+        self.logqueue = logqueue
+        self.target = max_active
+        self.stopped = threading.Event()
+        self.thread = threading.Thread(target=self.control, daemon=True)
+
+    def log(self, msg):
+        sb.logging.message(None, f"Autoscaling: {msg}", self.logqueue)
+
+    def decide(self, cpu, memory, failures, latency):
+        if failures:
+            return max(self.min_active, self.target // 2)
+        if ((cpu is not None and cpu > CPU_HIGH)
+                or (memory is not None and memory > MEMORY_HIGH)
+                or (latency is not None and latency > LATENCY_HIGH)):
+            return max(self.min_active, self.target - 1)
+        if ((cpu is None or cpu < CPU_LOW)
+                and (memory is None or memory < MEMORY_LOW)
+                and (latency is None or latency < LATENCY_LOW)
+                and self.scheduler.pending() > 0):
+            return min(self.max_active, self.target + 1)
+        return self.target
+
+    def control(self):
+        last_calls, last_failures, last_seconds = 0, 0, 0.0
+        while not self.stopped.wait(INTERVAL):
+            with self.docker_api.get_lock():
+                total_calls, total_failures, total_seconds = self.docker_api[:]
+            calls = int(total_calls - last_calls)
+            failures = int(total_failures - last_failures)
+            latency = (total_seconds - last_seconds) / calls if calls else None
+            last_calls, last_failures, last_seconds = total_calls, total_failures, total_seconds
+            cpu, memory = cpu_pressure(), memory_usage()
+            target = self.decide(cpu, memory, failures, latency)
+            if target != self.target:
+                fmt = lambda v, f: "n/a" if v is None else f.format(v)
+                self.log(f"{self.target} -> {target} active analysers;"
+                    f" cpu {fmt(cpu, '{:.1f}%')}, memory {fmt(memory, '{:.1f}%')},"
+                    f" docker {fmt(latency, '{:.2f}s')} per call, {failures}/{calls} calls failed")
+                self.target = target
+                self.slots.set_limit(target)
+
+    def start(self):
+        self.log(f"between {self.min_active} and {self.max_active} active analysers, starting with {self.target}")
+        self.slots.set_limit(self.target)
+        self.thread.start()
+
+    def stop(self):
+        self.stopped.set()
+        self.thread.join()
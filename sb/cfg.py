@@ -1,4 +1,4 @@
-import os, time, cpuinfo, platform
+import os, platform
 
 VERSION = "2.0.10"
 HOME = os.path.abspath(os.path.join(os.path.dirname(__file__), os.pardir))
@@ -12,16 +12,28 @@ TOOL_LOG = "result.log"
 TOOL_OUTPUT = "result.tar"
 PARSER_OUTPUT = "result.json"
 SARIF_OUTPUT = "result.sarif"
+SOLC_OUTPUT = "solc.json" # compiler output provided to the Docker container, in /sb
+CONTRACT_NAMES = "contractnames.txt" # deployable contracts, provided to the Docker container, in /sb
+REMAPPINGS = "remappings.txt" # locations of the imported files in the Docker container, in /sb
 
-CPU = cpuinfo.get_cpu_info()
-UNAME = platform.uname()
-PLATFORM = {
-    "smartbugs": VERSION,
-    "python": CPU.get("python_version"),
-    "system": UNAME.system,
-    "release": UNAME.release,
-    "version": UNAME.version,
-    "cpu": CPU.get("brand_raw"),
-}
+# information on the platform, determined on demand by platform_info(),
+# since cpuinfo takes about a second; worker processes receive it from the main process
+PLATFORM = None
+
+def platform_info():
+    global PLATFORM
+    if PLATFORM is None:
+        import cpuinfo
+        cpu = cpuinfo.get_cpu_info()
+        uname = platform.uname()
+        PLATFORM = {
+            "smartbugs": VERSION,
+            "python": cpu.get("python_version"),
+            "system": uname.system,
+            "release": uname.release,
+            "version": uname.version,
+            "cpu": cpu.get("brand_raw"),
+        }
+    return PLATFORM
 
 DEBUG = False
@@ -1,5 +1,5 @@
 import argparse, sys, os
-import sb.cfg, sb.colors, sb.smartbugs, sb.logging, sb.settings, sb.errors
+import sb.cfg, sb.colors, sb.logging, sb.settings, sb.errors
 
 def cli_args(defaults):
 
@@ -35,10 +35,19 @@ def cli_args(defaults):
         type=str,
         help=f"glob pattern specifying the files to analyse{fmt_default(defaults.files)}"
             "; may be prefixed by 'DIR:' for search relative to DIR")
+    input.add_argument("--remappings",
+        metavar="PREFIX=PATH",
+        nargs="+",
+        type=str,
+        help=f"locations of imported files, relative to the project root{fmt_default(defaults.remappings)}")
     input.add_argument("--main",
         action="store_true",
         default=None,
         help=f"if the Solidity file contains a contract named like the file, analyse this contract only{fmt_default('all contracts')}")
+    input.add_argument("--per-contract",
+        action="store_true",
+        default=None,
+        help=f"split Solidity files into one task per contract, for tools supporting it{fmt_default(defaults.per_contract)}")
     input.add_argument("--runtime",
         action="store_true",
         default=None,
@@ -49,6 +58,14 @@ def cli_args(defaults):
         type=int,
         metavar="N",
         help=f"number of parallel processes{fmt_default(defaults.processes)}")
+    exec.add_argument("--min-processes",
+        type=int,
+        metavar="N",
+        help=f"adapt the number of active processes between N and --processes to the load of the host and of Docker{fmt_default(defaults.min_processes)}")
+    exec.add_argument("--parsers",
+        type=int,
+        metavar="N",
+        help=f"number of parallel processes for parsing the output of the tools (with --json or --sarif){fmt_default(defaults.parsers)}")
     exec.add_argument("--timeout",
         type=int,
         metavar="N",
@@ -61,6 +78,26 @@ def cli_args(defaults):
         type=str,
         metavar="MEM",
         help=f"memory quota for docker containers, like 512m or 1g{fmt_default(defaults.mem_limit)}")
+    exec.add_argument("--mem-budget",
+        type=str,
+        metavar="MEM",
+        help=f"total memory limit of the containers running at the same time, like 16g; tasks running out of memory are retried once with twice the limit{fmt_default(defaults.mem_budget)}")
+    exec.add_argument("--stats-interval",
+        type=int,
+        metavar="N",
+        help=f"sample the resource usage of the containers every N seconds{fmt_default(defaults.stats_interval)}")
+    exec.add_argument("--compile",
+        action="store_true",
+        default=None,
+        help=f"compile Solidity files once on the host and provide the compiler output to the tools, which currently use it only to find the contracts with deployed code{fmt_default(defaults.compile)}")
+    exec.add_argument("--precheck",
+        action="store_true",
+        default=None,
+        help=f"skip tasks with unusable input, like invalid hex code or Solidity code that does not compile{fmt_default(defaults.precheck)}")
+    exec.add_argument("--cache",
+        type=str,
+        metavar="DIR",
+        help=f"folder for data shared between runs, like compiler outputs{fmt_default(defaults.cache)}")
 
     output = parser.add_argument_group("output options")
     output.add_argument("--runid",
@@ -75,6 +112,10 @@ def cli_args(defaults):
         type=str,
         metavar="FILE",
         help=f"file for log messages{fmt_default(defaults.log)}")
+    output.add_argument("--db",
+        type=str,
+        metavar="FILE",
+        help=f"SQLite database for the results, in addition to the result folders{fmt_default(defaults.db)}")
     output.add_argument("--overwrite",
         action="store_true",
         default=None,
@@ -87,6 +128,14 @@ def cli_args(defaults):
         action="store_true",
         default=None,
         help=f"parse output and write it to {sb.cfg.PARSER_OUTPUT} as well as {sb.cfg.SARIF_OUTPUT}{fmt_default(defaults.sarif)}")
+    output.add_argument("--compact-json",
+        action="store_true",
+        default=None,
+        help=f"write json and sarif files without indentation{fmt_default(defaults.compact_json)}")
+    output.add_argument("--merged-sarif",
+        type=str,
+        metavar="FILE",
+        help=f"parse output and write the findings of all tasks parsed in this run to a single sarif file{fmt_default(defaults.merged_sarif)}")
     output.add_argument("--quiet",
         action="store_true",
         default=None,
@@ -112,13 +161,16 @@ def cli_args(defaults):
     sb.cfg.DEBUG = args["debug"]
 
     if args["version"] or sb.cfg.DEBUG:
+        platform = sb.cfg.platform_info()
         print(
             f"SmartBugs {sb.cfg.VERSION}\n"
-            f"Python {sb.cfg.CPU.get('python_version')}\n"
-            f"{sb.cfg.UNAME.system} {sb.cfg.UNAME.release} {sb.cfg.UNAME.version}\n"
-            f"CPU {sb.cfg.CPU.get('brand_raw')}")
+            f"Python {platform['python']}\n"
+            f"{platform['system']} {platform['release']} {platform['version']}\n"
+            f"CPU {platform['cpu']}")
         if args["version"]:
             sys.exit(0)
+        # modules imported on demand, to include their versions
+        import docker, requests, yaml, solcx
         for module in sys.modules.values():
             if hasattr(module, "__version__"):
                 print(module.__name__, module.__version__)
@@ -149,6 +201,8 @@ def cli(site_cfg=sb.cfg.SITE_CFG):
 
 
 def main():
+    # imported here, to keep the startup fast for options like --version and --help
+    import sb.smartbugs
     try:
         settings = cli()
         sb.logging.message(None, f"Arguments passed: {sys.argv}")
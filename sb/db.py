@@ -0,0 +1,159 @@
+"""Optional SQLite sink for the results of a run.
+
+Analysers and parsers send their results to a queue; a thread of the main
+process writes them to the database, in batches of one transaction each.
+If writing fails, the thread logs the error, calls on_error to stop the run,
+and discards the remaining results.
+All tables are keyed by the result directory, so task logs and parse
+results may arrive in any order, and later results for the same
+directory replace earlier ones.
+"""
+
+import os, sqlite3, threading, traceback, queue as queues
+import sb.io, sb.logging, sb.colors
+
+BATCH = 500 # max. number of results per transaction
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS tasks (
+    rdir       TEXT PRIMARY KEY,
+    runid      TEXT,
+    filename   TEXT,
+    contract   TEXT,
+    tool       TEXT,
+    mode       TEXT,
+    start      REAL,
+    duration   REAL,
+    exit_code  INTEGER,
+    precheck   TEXT,
+    solc       TEXT,
+    task_log   TEXT
+);
+CREATE TABLE IF NOT EXISTS parsed (
+    rdir           TEXT PRIMARY KEY,
+    parser_version TEXT
+);
+CREATE TABLE IF NOT EXISTS findings (
+    rdir        TEXT,
+    name        TEXT,
+    filename    TEXT,
+    contract    TEXT,
+    function    TEXT,
+    line        INTEGER,
+    line_end    INTEGER,
+    column      INTEGER,
+    column_end  INTEGER,
+    address     INTEGER,
+    address_end INTEGER,
+    severity    TEXT,
+    level       TEXT,
+    message     TEXT,
+    details     TEXT
+);
+CREATE TABLE IF NOT EXISTS messages (
+    rdir    TEXT,
+    kind    TEXT, -- info, error, fail
+    message TEXT
+);
+CREATE INDEX IF NOT EXISTS tasks_tool ON tasks(tool, mode);
+CREATE INDEX IF NOT EXISTS tasks_filename ON tasks(filename);
+CREATE INDEX IF NOT EXISTS findings_rdir ON findings(rdir);
+CREATE INDEX IF NOT EXISTS findings_name ON findings(name);
+CREATE INDEX IF NOT EXISTS messages_rdir ON messages(rdir);
+CREATE VIEW IF NOT EXISTS results AS
+    SELECT t.filename, t.contract, t.tool AS toolid, t.mode AS toolmode, p.parser_version, t.runid,
+        t.start, t.duration, t.exit_code,
+        (SELECT group_concat(name) FROM (SELECT DISTINCT name FROM findings f WHERE f.rdir = t.rdir ORDER BY name)) AS findings,
+        (SELECT group_concat(message) FROM messages m WHERE m.rdir = t.rdir AND kind = 'info') AS infos,
+        (SELECT group_concat(message) FROM messages m WHERE m.rdir = t.rdir AND kind = 'error') AS errors,
+        (SELECT group_concat(message) FROM messages m WHERE m.rdir = t.rdir AND kind = 'fail') AS fails
+    FROM tasks t LEFT JOIN parsed p ON p.rdir = t.rdir;
+"""
+
+# finding fields with a column of their own, the other ones end up in 'details'
+FINDING_FIELDS = ("name", "filename", "contract", "function", "line", "line_end", "column", "column_end",
+    "address", "address_end", "severity", "level", "message")
+
+
+
+def open_db(fn):
+    d = os.path.dirname(fn)
+    if d:
+        os.makedirs(d, exist_ok=True)
+    con = sqlite3.connect(fn)
+    con.executescript(SCHEMA)
+    return con
+
+
+def write_task(con, rdir, task_log):
+    result = task_log["result"]
+    con.execute("INSERT OR REPLACE INTO tasks VALUES (?,?,?,?,?,?,?,?,?,?,?,?)", (
+        rdir, task_log["runid"], task_log["filename"], task_log.get("contract"),
+        task_log["tool"]["id"], task_log["tool"]["mode"],
+        result["start"], result["duration"], result["exit_code"], result.get("precheck"),
+        task_log.get("solc"), sb.io.dumps(task_log)))
+
+
+def write_parsed(con, rdir, parsed_result):
+    con.execute("INSERT OR REPLACE INTO parsed VALUES (?,?)", (rdir, parsed_result["parser"]["version"]))
+    con.execute("DELETE FROM findings WHERE rdir = ?", (rdir,))
+    con.execute("DELETE FROM messages WHERE rdir = ?", (rdir,))
+    rows = []
+    for finding in parsed_result["findings"]:
+        details = { k: v for k,v in finding.items() if k not in FINDING_FIELDS }
+        rows.append((rdir,) + tuple(finding.get(f) for f in FINDING_FIELDS)
+            + (sb.io.dumps(details) if details else None,))
+    con.executemany(f"INSERT INTO findings VALUES ({','.join('?'*(len(FINDING_FIELDS)+2))})", rows)
+    con.executemany("INSERT INTO messages VALUES (?,?,?)",
+        [ (rdir, kind, m) for kind in ("info","error","fail") for m in parsed_result[f"{kind}s"] ])
+
+
+WRITERS = {
+    "task": write_task,
+    "parsed": write_parsed,
+}
+
+# the exception that stopped the writer, if any
+error = None
+
+def writer(fn, queue, logqueue, on_error):
+    global error
+    done = False
+    try:
+        con = open_db(fn)
+        try:
+            while not done:
+                batch = [ queue.get() ]
+                while len(batch) < BATCH:
+                    try:
+                        batch.append(queue.get_nowait())
+                    except queues.Empty:
+                        break
+                with con:
+                    for item in batch:
+                        if item is None:
+                            done = True
+                            continue
+                        kind,rdir,data = item
+                        WRITERS[kind](con, rdir, data)
+        finally:
+            con.close()
+    except Exception as e:
+        error = e
+        sb.logging.message(sb.colors.error(f"Writing to the database {fn} failed, stopping the run:\n{e}"),
+            traceback.format_exc(), logqueue)
+        if on_error:
+            on_error()
+    # keep the queue empty, so processes writing to it can terminate
+    while not done:
+        done = queue.get() is None
+
+def start(fn, queue, logqueue=None, on_error=None):
+    global db_writer, error
+    error = None
+    db_writer = threading.Thread(target=writer, args=(fn,queue,logqueue,on_error))
+    db_writer.start()
+
+def stop(queue):
+    queue.put(None)
+    db_writer.join()
@@ -1,5 +1,5 @@
-import docker, os, shutil, tempfile, requests, traceback
-import sb.io, sb.errors, sb.cfg
+import os, shutil, tempfile, threading, time, traceback
+import sb.io, sb.errors, sb.cfg, sb.utils, sb.solidity
 
 
 
@@ -9,6 +9,7 @@ def client():
     global _client
     if not _client:
         try:    
+            import docker # imported on demand, as it takes a while to load
             _client = docker.from_env()
             _client.info()
         except Exception:
@@ -18,6 +19,32 @@ def client():
 
 
 
+# Docker API calls of this process: number, failures, total duration;
+# a shared array set by the analysers when autoscaling, see sb.autoscale
+api_stats = None
+
+def __api(call, *args, **kwargs):
+    if api_stats is None:
+        return call(*args, **kwargs)
+    import docker # loaded already by client()
+    failed = False
+    start = time.time()
+    try:
+        return call(*args, **kwargs)
+    except docker.errors.NotFound:
+        raise
+    except Exception:
+        failed = True
+        raise
+    finally:
+        duration = time.time() - start
+        with api_stats.get_lock():
+            api_stats[0] += 1
+            api_stats[1] += failed
+            api_stats[2] += duration
+
+
+
 images_loaded = set()
 
 def is_loaded(image):
@@ -43,6 +70,25 @@ def load(image):
 
 
 
+def __mountpoint(sbdir, unit):
+    # Create the mount points ourselves, since the ones created by Docker
+    # belong to root and would prevent the removal of sbdir
+    fn = os.path.join(sbdir, *unit.split("/"))
+    os.makedirs(os.path.dirname(fn), exist_ok=True)
+    open(fn, "a").close()
+
+
+
+def __mounts(task):
+    # Docker binds each host path only once, so a file imported under
+    # several unit names is mounted at the first one and copied to the others
+    mounts = {}
+    for unit,absfn in sorted(task.deps.items()):
+        mounts.setdefault(absfn, unit)
+    return { unit: absfn for absfn,unit in mounts.items() }
+
+
+
 def __docker_volume(task):
     sbdir = tempfile.mkdtemp()
     sbdir_bin = os.path.join(sbdir, "bin")
@@ -55,7 +101,24 @@ def __docker_volume(task):
         _,filename = os.path.split(task.absfn)
         sb.io.write_txt(os.path.join(sbdir,filename), code)
     else:
-        shutil.copy(task.absfn, sbdir)
+        fn = os.path.join(sbdir, *task.unit.split("/"))
+        os.makedirs(os.path.dirname(fn), exist_ok=True)
+        shutil.copy(task.absfn, fn)
+        mounts = __mounts(task)
+        for unit,absfn in task.deps.items():
+            if unit in mounts:
+                __mountpoint(sbdir, unit)
+            else:
+                fn = os.path.join(sbdir, *unit.split("/"))
+                os.makedirs(os.path.dirname(fn), exist_ok=True)
+                shutil.copy(absfn, fn)
+        if task.deps:
+            remappings = sb.solidity.container_remappings(task.unit, task.deps, "/sb")
+            sb.io.write_txt(os.path.join(sbdir,sb.cfg.REMAPPINGS), remappings)
+        if task.solc_output:
+            __mountpoint(sbdir, sb.cfg.SOLC_OUTPUT)
+        if task.contractnames is not None:
+            sb.io.write_txt(os.path.join(sbdir,sb.cfg.CONTRACT_NAMES), task.contractnames)
     if task.tool.bin:
         shutil.copytree(task.tool.absbin, sbdir_bin)
     else:
@@ -67,12 +130,24 @@ def __docker_volume(task):
 
 
 
+def mem_limit(task):
+    """The memory limit of the container for task, as specification or in bytes; None for no limit."""
+    return task.mem_limit or task.settings.mem_limit or task.tool.mem_limit
+
+
+
 def __docker_args(task, sbdir):
     args = {
         "volumes": {sbdir: {"bind": "/sb", "mode": "rw"}},
         "detach": True,
         "user": 0
     }
+    if task.solc_output:
+        # compiler output from the host cache, shared by all tasks, hence read-only
+        args["volumes"][task.solc_output] = {"bind": f"/sb/{sb.cfg.SOLC_OUTPUT}", "mode": "ro"}
+    for unit,absfn in __mounts(task).items():
+        # imported files are mounted, not copied, and shared by all tasks
+        args["volumes"][absfn] = {"bind": f"/sb/{unit}", "mode": "ro"}
     for k in ("image","cpu_quota","mem_limit"):
         v = getattr(task.tool, k, None)
         if v is not None:
@@ -81,21 +156,98 @@ def __docker_args(task, sbdir):
         v = getattr(task.settings, k, None)
         if v is not None:
             args[k] = v
-    filename = f"/sb/{os.path.split(task.absfn)[1]}" # path in Linux Docker image
+    if task.mem_limit:
+        args["mem_limit"] = task.mem_limit
+    filename = f"/sb/{task.unit}" # path in Linux Docker image
     timeout = task.settings.timeout or "0"
     main = 1 if task.settings.main else 0
-    args['command'] = task.tool.command(filename, timeout, "/sb/bin", main)
-    args['entrypoint'] = task.tool.entrypoint(filename, timeout, "/sb/bin", main)
+    contract = task.contract or ""
+    args['command'] = task.tool.command(filename, timeout, "/sb/bin", main, contract)
+    args['entrypoint'] = task.tool.entrypoint(filename, timeout, "/sb/bin", main, contract)
     return args
 
 
 
+class Sampler:
+    """Samples the resource usage of a running container in a thread.
+
+    Docker takes about a second for each sample, so the actual interval is
+    a bit longer than the requested one. The counters of the CPU time and
+    the I/O bytes are those of the last sample, missing the time after it."""
+
+    def __init__(self, container, interval):
+        self.container = container
+        self.interval = interval
+        self.samples = []
+        self.stopped = threading.Event()
+        self.thread = threading.Thread(target=self.sample, daemon=True)
+        self.thread.start()
+
+    def sample(self):
+        while not self.stopped.is_set():
+            try:
+                stats = self.container.stats(stream=False)
+            except Exception:
+                # the container may have terminated in the meantime
+                stats = None
+            # stopped containers are reported with a zero timestamp
+            if stats and not stats.get("read", "0001-").startswith("0001-"):
+                self.samples.append(stats)
+            self.stopped.wait(self.interval)
+
+    def stop(self):
+        self.stopped.set()
+        self.thread.join()
+
+    def summary(self):
+        """Peak memory and PIDs, and total CPU time and I/O, of the container; None if there are no samples."""
+        if not self.samples:
+            return None
+        memory_peak = pids_peak = 0
+        for stats in self.samples:
+            memory = stats.get("memory_stats") or {}
+            memory_peak = max(memory_peak, memory.get("max_usage") or 0, memory.get("usage") or 0)
+            pids_peak = max(pids_peak, (stats.get("pids_stats") or {}).get("current") or 0)
+        last = self.samples[-1]
+        io = { "read": 0, "write": 0 }
+        for entry in (last.get("blkio_stats") or {}).get("io_service_bytes_recursive") or []:
+            op = entry.get("op","").lower()
+            if op in io:
+                io[op] += entry.get("value") or 0
+        networks = (last.get("networks") or {}).values()
+        return {
+            "interval": self.interval,
+            "samples": len(self.samples),
+            "memory_peak": memory_peak, # bytes
+            "pids_peak": pids_peak,
+            "cpu_time": ((last.get("cpu_stats") or {}).get("cpu_usage") or {}).get("total_usage", 0) / 1e9, # seconds
+            "io_read": io["read"],   # bytes
+            "io_write": io["write"], # bytes
+            "net_rx": sum(n.get("rx_bytes", 0) for n in networks), # bytes
+            "net_tx": sum(n.get("tx_bytes", 0) for n in networks), # bytes
+        }
+
+
+
 def execute(task):
+    """Run the task in a container; return the exit code, the log lines, the output archive,
+    the arguments for creating the container, the durations of the phases,
+    a summary of the resource usage if it was sampled, and whether the container
+    ran out of memory (None if unknown)."""
+    import docker, requests # loaded already by client()
+    phases = sb.utils.Phases()
     sbdir = __docker_volume(task)
     args = __docker_args(task, sbdir)
-    exit_code,logs,output,container = None,[],None,None
+    phases.lap("volume")
+    exit_code,logs,output,container,sampler,oom_killed = None,[],None,None,None,None
     try:
-        container = client().containers.run(**args)
+        # like containers.run, but with separate timings for creating and starting the container
+        container = __api(client().containers.create, **args)
+        phases.lap("create")
+        __api(container.start)
+        phases.lap("start")
+        if task.settings.stats_interval:
+            sampler = Sampler(container, task.settings.stats_interval)
         try:
             result = container.wait(timeout=task.settings.timeout)
             exit_code = result["StatusCode"]
@@ -104,26 +256,39 @@ def execute(task):
                 container.stop(timeout=10)
             except docker.errors.APIError:
                 pass
-        logs = container.logs().decode("utf8").splitlines()
+        if sampler:
+            sampler.stop()
+        try:
+            container.reload()
+            oom_killed = container.attrs["State"]["OOMKilled"]
+        except Exception:
+            pass
+        phases.lap("run")
+        logs = __api(container.logs).decode("utf8").splitlines()
+        phases.lap("logs")
         if task.tool.output:
             try:
-                output,_ = container.get_archive(task.tool.output)
+                output,_ = __api(container.get_archive, task.tool.output)
                 output = b''.join(output)
             except docker.errors.NotFound:
                 pass
+            phases.lap("archive")
 
     except Exception as e:
         raise sb.errors.SmartBugsError(f"Problem running Docker container: {e})")
 
     finally:
+        if sampler:
+            sampler.stop()
         try:
             container.kill()
         except Exception:
             pass
         try:
-            container.remove()
+            __api(container.remove)
         except Exception:
             pass
         shutil.rmtree(sbdir)
+        phases.lap("teardown")
 
-    return exit_code, logs, output, args
+    return exit_code, logs, output, args, phases.timings, sampler.summary() if sampler else None, oom_killed
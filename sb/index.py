@@ -0,0 +1,188 @@
+"""Index of the result directories below a results root.
+
+Each run appends one line per task to INDEX_DIR/<runid>.jsonl in the
+results root, i.e. the leading part of the result directory template
+without variables. reparse and results2csv read the index instead of
+walking the directory tree, and fall back to a parallel walk if there
+is no index.
+
+The first run writing to a root with earlier results indexes them as well,
+in the writer thread. When reading the index, top-level folders of the root
+without any entries are walked; results added elsewhere within indexed
+folders, and deleted ones, need --rebuild-index.
+"""
+
+import os, sys, threading, concurrent.futures
+import sb.cfg, sb.io, sb.errors
+
+INDEX_DIR = ".smartbugs-index"
+INDEX_EXT = ".jsonl"
+SIZES = (sb.cfg.TASK_LOG, sb.cfg.TOOL_LOG, sb.cfg.TOOL_OUTPUT)
+WALKERS = 16 # parallel scandir calls, to hide the latency of network filesystems
+
+
+
+def root(template):
+    """Return the results root for a result directory template, or None if it has no fixed part."""
+    prefix = template.split("$")[0]
+    r = prefix if "$" not in template else os.path.dirname(prefix)
+    return r or None
+
+
+def record(rdir, root):
+    """Index entry for the result directory, or None if it contains no task log."""
+    try:
+        task_log = sb.io.read_json(os.path.join(rdir, sb.cfg.TASK_LOG))
+    except sb.errors.SmartBugsError:
+        return None
+    result = task_log.get("result", {})
+    if result.get("precheck"):
+        status = "precheck"
+    elif result.get("exit_code") is None:
+        status = "timeout"
+    else:
+        status = "completed"
+    sizes = {}
+    for fn in SIZES:
+        try:
+            sizes[fn] = os.path.getsize(os.path.join(rdir, fn))
+        except OSError:
+            pass
+    return {
+        "rdir": os.path.relpath(rdir, root),
+        "runid": task_log.get("runid"),
+        "tool": task_log["tool"]["id"],
+        "mode": task_log["tool"]["mode"],
+        "filename": task_log["filename"],
+        "contract": task_log.get("contract"),
+        "status": status,
+        "exit_code": result.get("exit_code"),
+        "sizes": sizes,
+    }
+
+
+
+def writer(root, runid, queue):
+    if not os.path.isdir(os.path.join(root, INDEX_DIR)) and os.path.isdir(root):
+        # results of earlier runs without an index would otherwise be missing from it;
+        # entries of this run arriving meanwhile wait in the queue
+        rebuild(root)
+    fn = os.path.join(root, INDEX_DIR, f"{runid}{INDEX_EXT}")
+    os.makedirs(os.path.dirname(fn), exist_ok=True)
+    with open(fn, "a", encoding="utf-8") as f:
+        while True:
+            entry = queue.get()
+            if entry is None:
+                break
+            print(sb.io.dumps(entry), file=f, flush=True)
+
+def start(root, runid, queue):
+    global index_writer
+    index_writer = threading.Thread(target=writer, args=(root,runid,queue))
+    index_writer.start()
+
+def stop(queue):
+    queue.put(None)
+    index_writer.join()
+
+
+
+def read(root):
+    """Return the index entries of all runs below root, or None if there is no index."""
+    d = os.path.join(root, INDEX_DIR)
+    if not os.path.isdir(d):
+        return None
+    entries = {}
+    for fn in sorted(os.listdir(d)):
+        if not fn.endswith(INDEX_EXT):
+            continue
+        with open(os.path.join(d, fn), encoding="utf-8") as f:
+            for line in f:
+                try:
+                    entry = sb.io.loads(line)
+                except ValueError:
+                    # incomplete line of an interrupted run
+                    continue
+                # later entries for the same directory supersede earlier ones
+                entries[entry["rdir"]] = entry
+    return list(entries.values())
+
+
+def walk(root):
+    """Return all directories below root containing a task log, scanning directories in parallel."""
+    def scan(d):
+        found, subdirs = False, []
+        try:
+            with os.scandir(d) as it:
+                for e in it:
+                    if e.name == sb.cfg.TASK_LOG:
+                        found = True
+                    elif e.name != INDEX_DIR and e.is_dir(follow_symlinks=False):
+                        subdirs.append(e.path)
+        except OSError:
+            pass
+        return found, subdirs
+
+    rdirs = []
+    with concurrent.futures.ThreadPoolExecutor(WALKERS) as executor:
+        pending = { executor.submit(scan, root): root }
+        while pending:
+            done,_ = concurrent.futures.wait(pending, return_when=concurrent.futures.FIRST_COMPLETED)
+            for future in done:
+                d = pending.pop(future)
+                found, subdirs = future.result()
+                if found:
+                    rdirs.append(d)
+                for s in subdirs:
+                    pending[executor.submit(scan, s)] = s
+    return rdirs
+
+
+def rebuild(root):
+    """Replace the index of root by one obtained from walking the directory tree."""
+    runs = {}
+    with concurrent.futures.ThreadPoolExecutor(WALKERS) as executor:
+        for entry in executor.map(lambda rdir: record(rdir, root), walk(root)):
+            if entry:
+                runs.setdefault(entry["runid"], []).append(entry)
+    d = os.path.join(root, INDEX_DIR)
+    os.makedirs(d, exist_ok=True)
+    for fn in os.listdir(d):
+        if fn.endswith(INDEX_EXT):
+            os.remove(os.path.join(d, fn))
+    for runid,entries in runs.items():
+        lines = [ sb.io.dumps(e) for e in sorted(entries, key=lambda e: e["rdir"]) ]
+        sb.io.write_txt(os.path.join(d, f"{runid}{INDEX_EXT}"), lines)
+    return [ e for entries in runs.values() for e in entries ]
+
+
+
+def unindexed(root, entries):
+    """Return the top-level folders of root that contain no indexed result directory."""
+    indexed = { os.path.normpath(e["rdir"]).split(os.sep)[0] for e in entries }
+    try:
+        with os.scandir(root) as it:
+            return [ e.path for e in it
+                if e.name != INDEX_DIR and e.name not in indexed and e.is_dir(follow_symlinks=False) ]
+    except OSError:
+        return []
+
+
+def result_dirs(roots, rebuild_index=False):
+    """Return the result directories below the roots, using the index if present."""
+    result = set()
+    for r in roots:
+        es = rebuild(r) if rebuild_index else read(r)
+        if es is None:
+            result.update(walk(r))
+            continue
+        result.update(os.path.normpath(os.path.join(r, e["rdir"])) for e in es)
+        if rebuild_index:
+            continue
+        for d in unindexed(r, es):
+            found = walk(d)
+            if found:
+                print(f"Index of {r}: {len(found)} result director(y/ies) in {d} not indexed;"
+                    " use --rebuild-index to update the index", file=sys.stderr)
+                result.update(found)
+    return result
@@ -1,7 +1,40 @@
-import yaml, json
+import json
 import sb.errors
 
+# faster JSON backend, if installed; the standard library is the fallback
+try:
+    import orjson
+except ImportError:
+    orjson = None
+
+# write JSON files without indentation; set from the settings
+compact = False
+
+def dumps(output, indent=False):
+    """Serialize output to JSON with sorted keys."""
+    if orjson:
+        try:
+            option = orjson.OPT_SORT_KEYS | (orjson.OPT_INDENT_2 if indent else 0)
+            return orjson.dumps(output, option=option).decode("utf-8")
+        except TypeError:
+            # not supported by orjson, like integers beyond 64 bit or non-string keys
+            pass
+    # same format as orjson
+    if indent:
+        return json.dumps(output, sort_keys=True, indent=2, ensure_ascii=False)
+    return json.dumps(output, sort_keys=True, separators=(",", ":"), ensure_ascii=False)
+
+def loads(s):
+    if orjson:
+        try:
+            return orjson.loads(s)
+        except ValueError:
+            # not accepted by orjson, like NaN written by the standard library
+            pass
+    return json.loads(s)
+
 def read_yaml(fn):
+    import yaml # imported on demand, as it takes a while to load
     try:
         with open(fn, 'r', encoding='utf-8') as f:
             # for an empty file, return empty dict, not NoneType
@@ -11,14 +44,14 @@ def read_yaml(fn):
 
 def read_json(fn):
     try:
-        with open(fn, 'r', encoding='utf-8') as f:
-            return json.load(f)
+        with open(fn, 'rb') as f:
+            return loads(f.read())
     except Exception as e:
         raise sb.errors.SmartBugsError(e)
 
 def write_json(fn, output):
     try:
-        j = json.dumps(output, sort_keys=True, indent=4)
+        j = dumps(output, indent=not compact)
         with open(fn, 'w', encoding='utf-8') as f:
             print(j, file=f)
     except Exception as e:
@@ -31,6 +64,14 @@ def read_lines(fn):
     except Exception as e:
         raise sb.errors.SmartBugsError(e)
 
+def read_txt(fn):
+    try:
+        # newline="" keeps line ends as they are, e.g. for hashing or source offsets
+        with open(fn, 'r', encoding='utf-8', newline='') as f:
+            return f.read()
+    except Exception as e:
+        raise sb.errors.SmartBugsError(e)
+
 def write_txt(fn, output):
     try:
         with open(fn, 'w', encoding='utf-8') as f:
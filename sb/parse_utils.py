@@ -1,6 +1,7 @@
 '''Utilities for the output parsers'''
 
-import re
+import functools, io, os, re, tarfile
+import sb.errors, sb.io
 
 DOCKER_CODES = {
     125: "DOCKER_INVOCATION_PROBLEM",
@@ -12,6 +13,99 @@ DOCKER_CODES = {
 }
 
 
+TAIL_BLOCK = 8192
+
+class LogLines:
+    """Lines of the tool log (stdout/stderr of the Docker run), read lazily.
+
+    The source is a filename, a list of lines, or None for an empty log.
+    Each iteration reads the file anew and yields the lines without line
+    ends, like str.splitlines. tail(n) reads only the end of the file.
+    """
+
+    def __init__(self, source=None):
+        self.source = source
+
+    def __bool__(self):
+        if isinstance(self.source, str):
+            try:
+                return os.path.getsize(self.source) > 0
+            except OSError:
+                return False
+        return bool(self.source)
+
+    def __iter__(self):
+        if not isinstance(self.source, str):
+            yield from self.source or ()
+            return
+        try:
+            f = open(self.source, 'r', encoding='utf-8')
+        except Exception as e:
+            raise sb.errors.SmartBugsError(e)
+        with f:
+            for line in f:
+                yield from line.splitlines()
+
+    def tail(self, n=1):
+        """Return the last n lines as a list."""
+        if n <= 0:
+            return []
+        if not isinstance(self.source, str):
+            return list(self.source or ())[-n:]
+        try:
+            with open(self.source, 'rb') as f:
+                pos = f.seek(0, os.SEEK_END)
+                data = b""
+                while pos > 0 and data.count(b"\n") <= n:
+                    size = min(TAIL_BLOCK, pos)
+                    pos -= size
+                    f.seek(pos)
+                    data = f.read(size) + data
+        except Exception as e:
+            raise sb.errors.SmartBugsError(e)
+        if pos > 0:
+            # drop the partial first line
+            data = data[data.index(b"\n")+1:]
+        return data.decode('utf-8').splitlines()[-n:]
+
+    def text(self):
+        """Return the complete log as a single string, lines joined by newlines."""
+        return "\n".join(self)
+
+
+class Archive:
+    """Tar archive of the files produced by the tool, opened on demand.
+
+    The source is a filename, the archive as bytes, or None if there is no
+    archive. open() returns a tarfile.TarFile; for a file, the members are
+    read from disk only when they are extracted.
+    """
+
+    def __init__(self, source=None):
+        self.source = source
+
+    def __bool__(self):
+        if isinstance(self.source, str):
+            try:
+                return os.path.getsize(self.source) > 0
+            except OSError:
+                return False
+        return bool(self.source)
+
+    def open(self):
+        if isinstance(self.source, str) and os.path.exists(self.source):
+            return tarfile.open(self.source)
+        # an empty file object yields the same errors as a missing archive in parser API v1
+        data = self.source if isinstance(self.source, bytes) else b""
+        return tarfile.open(fileobj=io.BytesIO(data))
+
+    def read(self):
+        """Return the archive as bytes, or None if there is none (parser API v1)."""
+        if isinstance(self.source, str):
+            return sb.io.read_bin(self.source) if os.path.exists(self.source) else None
+        return self.source
+
+
 ANSI = re.compile("\x1b\\[[^m]*m")
 def discard_ANSI(lines):
     return ( ANSI.sub('',line) for line in lines )
@@ -22,6 +116,113 @@ def truncate_message(m, length=205):
     return m if len(m) <= length else m[:half_length]+' ... '+m[-half_length:]
 
 
+PATTERN = type(re.compile(""))
+BACKREF = re.compile(r"\\[1-9]|\(\?P=")
+SPECIAL = set(".^$*+?{}[]\\|()")
+FLAGS = (re.ASCII, "a"), (re.IGNORECASE, "i"), (re.MULTILINE, "m"), (re.DOTALL, "s"), (re.VERBOSE, "x")
+
+
+def literal_prefix(pattern):
+    """Literal text every match of the anchored pattern starts with, or "" if unknown."""
+    src = pattern.pattern
+    if "|" in src or pattern.flags & (re.IGNORECASE | re.VERBOSE):
+        return ""
+    if src.startswith("^"):
+        src = src[1:]
+    prefix = []
+    i = 0
+    while i < len(src):
+        c = src[i]
+        if c == "\\" and i+1 < len(src) and not src[i+1].isalnum():
+            # escaped special character
+            c = src[i+1]
+            i += 1
+        elif c in SPECIAL:
+            # a quantifier applies to the preceding character, which is thus optional
+            if c in "*?{" and prefix:
+                prefix.pop()
+            break
+        prefix.append(c)
+        i += 1
+    return "".join(prefix)
+
+
+def _scoped(pattern):
+    """Pattern source with its flags moved into a local group, for use within a larger regex."""
+    flags = "".join(f for flag,f in FLAGS if pattern.flags & flag)
+    return f"(?{flags}:{pattern.pattern})" if flags else pattern.pattern
+
+
+def _combine(rules):
+    """Combine the patterns into a single regex with one group per rule.
+
+    Returns None if there are no rules, and the list of rules if they
+    cannot be combined (back references are numbered per regex).
+    Otherwise returns the regex and a map from group index to rule."""
+    if not rules:
+        return None
+    if any(BACKREF.search(pattern.pattern) for _,pattern in rules):
+        return rules
+    try:
+        matcher = re.compile("|".join(f"(?P<_{i}>{_scoped(pattern)})" for i,(_,pattern) in enumerate(rules)))
+    except re.error:
+        return rules
+    return matcher, { matcher.groupindex[f"_{i}"]: rule for i,rule in enumerate(rules) }
+
+
+class Scanner:
+    """Match lines against a list of patterns in a single pass.
+
+    Rules are pairs of a key and one or more patterns (strings or compiled
+    regexes). A line is handled by the first rule in declaration order
+    whose pattern matches at the beginning of the line, like a sequence of
+    `pattern.match(line)` tests would. All patterns are combined into one
+    regex; lines not starting with the literal prefix of any pattern are
+    only checked against the patterns without such a prefix.
+    """
+
+    def __init__(self, *rules):
+        self.rules = []
+        for key,patterns in rules:
+            if isinstance(patterns, (str, PATTERN)):
+                patterns = (patterns,)
+            for pattern in patterns:
+                self.rules.append((key, re.compile(pattern)))
+        prefixes = [ literal_prefix(pattern) for _,pattern in self.rules ]
+        self.prefixes = tuple(p for p in prefixes if p)
+        self.matcher = _combine(self.rules)
+        self.unprefixed = _combine([ rule for rule,prefix in zip(self.rules,prefixes) if not prefix ])
+
+    def match(self, line):
+        """Return the key of the first matching rule and its match object, or (None, None)."""
+        matcher = self.matcher if line.startswith(self.prefixes) else self.unprefixed
+        if matcher is None:
+            return None, None
+        if isinstance(matcher, list):
+            for key,pattern in matcher:
+                m = pattern.match(line)
+                if m:
+                    return key, m
+            return None, None
+        regex,groups = matcher
+        m = regex.match(line)
+        if not m:
+            return None, None
+        key,pattern = groups[m.lastindex]
+        # re-match with the original pattern, to obtain its groups
+        return key, pattern.match(line)
+
+    def scan(self, lines, handlers):
+        """Call handlers[key](m) for each line matching a rule with the given key."""
+        match = self.match
+        for line in lines:
+            key,m = match(line)
+            if key is not None:
+                handler = handlers.get(key)
+                if handler:
+                    handler(m)
+
+
 TRACEBACK = "Traceback (most recent call last):" # Python
 
 EXCEPTIONS = (
@@ -29,6 +230,7 @@ EXCEPTIONS = (
     re.compile('Exception in thread "[^"]*" (.*)'), # Java
     re.compile("thread '[^']*' panicked at '([^']*)'"), # Rust
 )
+EXCEPTIONS_SCANNER = Scanner(("exception", EXCEPTIONS))
 
 def exceptions(lines):
     exceptions = set()
@@ -40,7 +242,8 @@ def exceptions(lines):
                 traceback = False
         elif line.endswith(TRACEBACK):
             traceback = True
-        else:
+        elif EXCEPTIONS_SCANNER.match(line)[0]:
+            # rare, so the combined scanner serves as a filter; record every matching pattern
             for re_exception in EXCEPTIONS:
                 m = re_exception.match(line)
                 if m:
@@ -48,12 +251,16 @@ def exceptions(lines):
     return exceptions
 
 
+@functools.lru_cache(maxsize=64)
+def scanner(patterns):
+    """Combined scanner for a tuple of patterns, built once per distinct tuple."""
+    return Scanner(("match", patterns))
+
 def add_match(matches, line, patterns):
-    for pattern in patterns:
-        m = pattern.match(line)
-        if m:
-            matches.add(m[1])
-            return True
+    _,m = scanner(tuple(patterns)).match(line)
+    if m:
+        matches.add(m[1])
+        return True
     return False
 
 
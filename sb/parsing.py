@@ -1,5 +1,5 @@
-import os, importlib.util
-import sb.cfg, sb.errors
+import os, importlib.util, multiprocessing
+import sb.cfg, sb.errors, sb.parse_utils
 
 tool_parsers = {}
 
@@ -20,14 +20,74 @@ def get_parser(tool):
 
 
 
+# files in a result directory that the parse result depends on
+INPUTS = (sb.cfg.TASK_LOG, sb.cfg.TOOL_LOG, sb.cfg.TOOL_OUTPUT)
+
+def fingerprint(rdir):
+    """Size and modification time of the input files present in rdir.
+
+    Stored in the parse result, to detect whether it is up to date."""
+    inputs = {}
+    for fn in INPUTS:
+        try:
+            st = os.stat(os.path.join(rdir, fn))
+        except OSError:
+            continue
+        inputs[fn] = { "size": st.st_size, "mtime_ns": st.st_mtime_ns }
+    return inputs
+
+
+
+def up_to_date(rdir, tool, parsed_result):
+    """Check whether parsed_result was produced by the current parser from the current inputs."""
+    try:
+        version = get_parser(tool).VERSION
+    except sb.errors.SmartBugsError:
+        return False
+    return (parsed_result.get("parser") == { "id": tool["id"], "mode": tool["mode"], "version": version }
+        and parsed_result.get("inputs") == fingerprint(rdir))
+
+
+
+def context():
+    """Multiprocessing context for worker processes that parse results.
+
+    Where available, a forkserver is used that imports sb.preload, and
+    thus all parsers, before forking the workers. Otherwise, the workers
+    are spawned and load the parsers on demand.
+    """
+    if "forkserver" in multiprocessing.get_all_start_methods():
+        mp = multiprocessing.get_context("forkserver")
+        mp.set_forkserver_preload(["sb.preload"])
+        return mp
+    return multiprocessing.get_context("spawn")
+
+
+
 def parse(task_log, tool_log, tool_output):
+    """tool_log: LogLines or list of lines; tool_output: Archive, bytes or None"""
     tool = task_log["tool"]
     filename = task_log["filename"]
+    contract = task_log.get("contract")
     exit_code = task_log["result"]["exit_code"]
 
+    precheck = task_log["result"].get("precheck")
+
+    if not isinstance(tool_log, sb.parse_utils.LogLines):
+        tool_log = sb.parse_utils.LogLines(tool_log)
+    if not isinstance(tool_output, sb.parse_utils.Archive):
+        tool_output = sb.parse_utils.Archive(tool_output)
+
     tool_parser = get_parser(tool)
     try:
-        findings,infos,errors,fails = tool_parser.parse(exit_code, tool_log, tool_output)
+        if precheck:
+            # the tool was not run, as the input was found to be unusable
+            findings,infos,errors,fails = [],set(),set(),{precheck}
+        elif getattr(tool_parser, "API", 1) >= 2:
+            findings,infos,errors,fails = tool_parser.parse(exit_code, tool_log, tool_output)
+        else:
+            # parser API v1: the log as a list of lines, the output as bytes
+            findings,infos,errors,fails = tool_parser.parse(exit_code, list(tool_log), tool_output.read())
         for finding in findings:
             # if FINDINGS is defined, ensure that the current finding is in FINDINGS
             # irrelevant for SmartBugs, but may be relevant for programs further down the line
@@ -37,6 +97,9 @@ def parse(task_log, tool_log, tool_output):
             # splitting at "/" is ok, since it is a Linux path from within the docker container
             assert not finding.get("filename") or filename.endswith(finding["filename"].split("/")[-1])
             finding["filename"] = filename
+            # the task was restricted to a single contract
+            if contract and not finding.get("contract"):
+                finding["contract"] = contract
     except Exception as e:
         raise
         # raise sb.errors.SmartBugsError(f"Parsing of results failed\n{e}")
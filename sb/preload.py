@@ -0,0 +1,5 @@
+"""Preloaded by the forkserver of sb.parsing.context(), so the parser workers start with all parsers loaded."""
+
+import sb.registry
+
+sb.registry.get()
@@ -0,0 +1,168 @@
+import argparse, csv, math, os, sys, multiprocessing
+import sb.index, sb.resources, sb.utils
+
+# the values cover this share of the tasks, plus some headroom
+QUANTILE = 0.95
+HEADROOM = 1.2
+
+CPU_PERIOD = 100000     # [us] Docker's default period for cpu_quota
+CPU_QUOTA_STEP = 10000  # [us]
+MEM_STEP = 64 * 2**20   # [bytes]
+TIMEOUT_STEP = 60       # [s]
+
+def main():
+    argparser = argparse.ArgumentParser(
+        prog="recommend",
+        description="Propose per-tool values for timeout, mem_limit and cpu_quota, based on the results of previous runs.")
+    argparser.add_argument("-v",
+        action='store_true',
+        help="verbose: show progress")
+    argparser.add_argument("--csv",
+        action='store_true',
+        help="write the recommendations in csv format")
+    argparser.add_argument("--cpus",
+        type=int,
+        metavar="N",
+        default=os.cpu_count(),
+        help="number of CPUs of the host for running the tools (default: number of CPUs of this machine)")
+    argparser.add_argument("--memory",
+        metavar="MEM",
+        default=None,
+        help="memory of the host for running the tools, like 64g (default: memory of this machine)")
+    argparser.add_argument("--processes",
+        type=int,
+        metavar="N",
+        default=1,
+        help="number of parallel processes reading the results (default 1)")
+    argparser.add_argument("--rebuild-index",
+        action="store_true",
+        help=f"rebuild the index of the result directories ({sb.index.INDEX_DIR}) from the directory tree")
+    argparser.add_argument("results",
+        nargs="+",
+        metavar="DIR",
+        help="directories containing the run results")
+
+    if len(sys.argv)==1:
+        argparser.print_help(sys.stderr)
+        sys.exit(1)
+
+    args = argparser.parse_args()
+
+    memory = sb.utils.mem2bytes(args.memory) if args.memory else host_memory()
+
+    results = sb.index.result_dirs(args.results, args.rebuild_index)
+    per_tool = collect(results, args.processes, args.v)
+
+    header = ["tool", "mode", "tasks", "sampled", "timeouts", "ooms", "timeout", "mem_limit", "cpu_quota", "per_host"]
+    rows = []
+    for (toolid,toolmode),stats in sorted(per_tool.items()):
+        timeout, mem_limit, cpu_quota = recommend(stats)
+        per_host = []
+        if cpu_quota and args.cpus:
+            per_host.append(args.cpus * CPU_PERIOD // cpu_quota)
+        if mem_limit and memory:
+            per_host.append(memory // mem_limit)
+        rows.append([toolid, toolmode, stats["tasks"], len(stats["memory_peak"]), stats["timeouts"], len(stats["ooms"]),
+            timeout, sb.utils.bytes2mem(mem_limit) if mem_limit else None, cpu_quota,
+            max(1, min(per_host)) if per_host else None])
+
+    if args.csv:
+        csv_out = csv.writer(sys.stdout)
+        csv_out.writerow(header)
+        csv_out.writerows(rows)
+    else:
+        rows = [ header ] + [ [ "-" if c is None else str(c) for c in row ] for row in rows ]
+        widths = [ max(len(row[i]) for row in rows) for i in range(len(header)) ]
+        for row in rows:
+            print("  ".join(c.ljust(w) if i < 2 else c.rjust(w) for i,(c,w) in enumerate(zip(row, widths))))
+
+
+
+def collect(results, processes, verbose=False):
+    """Read the task logs in the result directories; return a dict mapping (tool id, tool mode)
+    to the number of tasks and timeouts, the durations of the completed tasks,
+    the memory limits of the tasks that ran out of memory, and the sampled peak memory and CPU shares."""
+    per_tool = {}
+    if processes > 1:
+        # spawn processes (instead of forking), for identical behavior on Linux and MacOS
+        mp = multiprocessing.get_context("spawn")
+        pool = mp.Pool(processes)
+        task_logs = pool.imap(sb.resources.read_task_log, sorted(results), chunksize=16)
+    else:
+        pool = None
+        task_logs = map(sb.resources.read_task_log, sorted(results))
+    try:
+        for r,task_log,msg in task_logs:
+            if verbose:
+                print(r, file=sys.stderr)
+            if msg:
+                print(msg, file=sys.stderr)
+                continue
+            result = task_log["result"]
+            if result.get("precheck"):
+                # the tool did not run
+                continue
+            key = (task_log["tool"]["id"], task_log["tool"]["mode"])
+            stats = per_tool.setdefault(key,
+                { "tasks": 0, "timeouts": 0, "durations": [], "ooms": [], "memory_peak": [], "cpu_share": [] })
+            stats["tasks"] += 1
+            oom_killed = result.get("oom_killed")
+            if oom_killed is None:
+                oom_killed = result["exit_code"] == 137
+            if oom_killed:
+                mem_limit = (task_log.get("docker") or {}).get("mem_limit")
+                stats["ooms"].append(sb.utils.mem2bytes(mem_limit) if mem_limit else None)
+            elif result["exit_code"] is None:
+                # the container was stopped after the timeout
+                stats["timeouts"] += 1
+            else:
+                stats["durations"].append(result["duration"])
+            metrics = sb.resources.task_metrics(task_log)
+            for m in ("memory_peak", "cpu_share"):
+                if m in metrics:
+                    stats[m].append(metrics[m])
+    finally:
+        if pool:
+            pool.close()
+            pool.join()
+    return per_tool
+
+
+
+def recommend(stats):
+    """Timeout [s], mem_limit [bytes] and cpu_quota [us per CPU_PERIOD] for a tool, or None where there is no data.
+
+    Tasks that ran out of memory are assumed to need twice their limit.
+    Tasks that timed out are not taken into account, as their duration tells
+    nothing about the time they would need."""
+    def round_up(v, step):
+        return max(step, int(math.ceil(v * HEADROOM / step)) * step)
+
+    durations = stats["durations"]
+    timeout = round_up(sb.resources.quantile(durations, QUANTILE), TIMEOUT_STEP) if durations else None
+
+    memory = stats["memory_peak"] + [ 2*m for m in stats["ooms"] if m ]
+    mem_limit = round_up(sb.resources.quantile(memory, QUANTILE), MEM_STEP) if memory else None
+
+    cpu_share = stats["cpu_share"]
+    cpu_quota = round_up(sb.resources.quantile(cpu_share, QUANTILE) * CPU_PERIOD, CPU_QUOTA_STEP) if cpu_share else None
+
+    return timeout, mem_limit, cpu_quota
+
+
+
+def host_memory():
+    """Total memory of this machine in bytes, or None if unknown."""
+    try:
+        with open("/proc/meminfo") as f:
+            for line in f:
+                if line.startswith("MemTotal:"):
+                    return int(line.split()[1]) * 1024
+    except (OSError, ValueError, IndexError):
+        pass
+    return None
+
+
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -0,0 +1,75 @@
+"""Registry of all tool parsers, findings metadata and sarif rules.
+
+get() discovers, imports and validates the parsers and findings.yaml
+files of all tools under tools/ once. Worker processes created via
+sb.parsing.context() start from a forkserver that has called it already
+(see sb.preload), so they do not repeat the work. check() validates just
+the parsers of the tools in a run.
+"""
+
+import os
+import sb.cfg, sb.tools, sb.parsing, sb.sarif, sb.errors
+
+
+
+# all tools, and the problems found when loading the parsers (tool id/mode -> message); set by get()
+tools = None
+problems = {}
+
+def validate(tool, module):
+    if not callable(getattr(module, "parse", None)):
+        raise sb.errors.SmartBugsError(f"Parser for {tool.id}/{tool.mode}: function 'parse' missing")
+    if not isinstance(getattr(module, "VERSION", None), str):
+        raise sb.errors.SmartBugsError(f"Parser for {tool.id}/{tool.mode}: VERSION missing or not a string")
+    if not isinstance(getattr(module, "FINDINGS", None), (set, frozenset, tuple, list, dict)):
+        raise sb.errors.SmartBugsError(f"Parser for {tool.id}/{tool.mode}: FINDINGS missing or not a collection")
+    if not isinstance(getattr(module, "API", 1), int):
+        raise sb.errors.SmartBugsError(f"Parser for {tool.id}/{tool.mode}: API is not an integer")
+
+
+def load():
+    """Import and validate all parsers, and compile all findings.yaml files into sarif rules.
+
+    The modules end up in the caches of sb.parsing.get_parser,
+    sb.tools.info_finding and sb.sarif.rule_table. Tools that cannot be loaded or fail the
+    validation are recorded in 'problems'.
+    """
+    tools, seen = [], set()
+    for id in sorted(os.listdir(sb.cfg.TOOLS_HOME)):
+        if not os.path.isfile(os.path.join(sb.cfg.TOOLS_HOME, id, sb.cfg.TOOL_CONFIG)):
+            continue
+        try:
+            sb.tools.load([id], tools, seen)
+        except (sb.errors.SmartBugsError, sb.errors.InternalError) as e:
+            problems[id] = str(e)
+    for tool in tools:
+        try:
+            module = sb.parsing.get_parser(tool.dict())
+            validate(tool, module)
+            # fills the caches of sb.tools.info_finding and sb.sarif.rule_table
+            sb.sarif.rule_table(tool.id)
+        except Exception as e:
+            # like a broken findings.yaml; must not affect the other tools
+            problems[f"{tool.id}/{tool.mode}"] = str(e)
+    return tools
+
+
+
+def get():
+    """Load all tools and parsers on first use; return the tools."""
+    global tools
+    if tools is None:
+        tools = load()
+    return tools
+
+
+
+def check(tools):
+    """Validate the parsers of the given tools; return a list of problems."""
+    msgs = []
+    for tool in tools:
+        try:
+            validate(tool, sb.parsing.get_parser(tool.dict()))
+        except sb.errors.SmartBugsError as e:
+            msgs.append(str(e))
+    return msgs
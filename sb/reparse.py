@@ -1,9 +1,16 @@
-import os, argparse, multiprocessing, sys
-import sb.cfg, sb.io, sb.parsing, sb.sarif, sb.errors
+import os, argparse, sys, time
+import sb.cfg, sb.io, sb.index, sb.parsing, sb.parse_utils, sb.sarif, sb.errors, sb.registry
 
 
 
-def reparser(taskqueue, sarif, verbose):
+def selected(tool, tools):
+    """Check whether the tool matches one of the specifications 'id' or 'id/mode'."""
+    return not tools or tool["id"] in tools or f"{tool['id']}/{tool['mode']}" in tools
+
+
+
+def reparser(taskqueue, sarif, verbose, force, tools, compact_json):
+    sb.io.compact = compact_json
     while True:
         d = taskqueue.get()
         if d is None:
@@ -20,6 +27,22 @@ def reparser(taskqueue, sarif, verbose):
                 print(f"{d}: {sb.cfg.TASK_LOG} not found, skipping")
             continue
 
+        # fingerprint before reading, such that later changes of the inputs are detected
+        inputs = sb.parsing.fingerprint(d)
+        sbj = sb.io.read_json(fn_sbj)
+        if not selected(sbj["tool"], tools):
+            continue
+
+        if not force and os.path.exists(fn_json) and (os.path.exists(fn_sarif) or not sarif):
+            try:
+                old_result = sb.io.read_json(fn_json)
+            except sb.errors.SmartBugsError:
+                old_result = {}
+            if sb.parsing.up_to_date(d, sbj["tool"], old_result):
+                if verbose:
+                    print(f"{d}: up to date, skipping")
+                continue
+
         for fn in (fn_json, fn_sarif):
             try:
                 os.remove(fn)
@@ -31,14 +54,16 @@ def reparser(taskqueue, sarif, verbose):
 
         if verbose:
             print(d)
-        sbj = sb.io.read_json(fn_sbj)
-        log = sb.io.read_lines(fn_log) if os.path.exists(fn_log) else []
-        tar = sb.io.read_bin(fn_tar) if os.path.exists(fn_tar) else None
+        parse_start_time = time.time()
+        log = sb.parse_utils.LogLines(fn_log if os.path.exists(fn_log) else None)
+        tar = sb.parse_utils.Archive(fn_tar if os.path.exists(fn_tar) else None)
         try:
             parsed_result = sb.parsing.parse(sbj, log, tar)
         except sb.errors.SmartBugsError as e:
             print(e)
             continue
+        parsed_result["inputs"] = inputs
+        parsed_result["timings"] = { "parse": time.time() - parse_start_time }
         sb.io.write_json(fn_json, parsed_result)
         if sarif:
             sarif_result = sb.sarif.sarify(sbj["tool"], parsed_result["findings"])
@@ -53,6 +78,17 @@ def main():
     argparser.add_argument("--sarif",
         action="store_true",
         help=f"generate sarif output, {sb.cfg.SARIF_OUTPUT}, as well")
+    argparser.add_argument("--force",
+        action="store_true",
+        help="reparse all results, also those that are up to date")
+    argparser.add_argument("--tools",
+        nargs="+",
+        metavar="TOOL",
+        default=[],
+        help="reparse only the results of these tools, given as id or id/mode (default: all)")
+    argparser.add_argument("--compact-json",
+        action="store_true",
+        help="write json and sarif files without indentation")
     argparser.add_argument("--processes",
         type=int,
         metavar="N",
@@ -61,6 +97,9 @@ def main():
     argparser.add_argument("-v",
         action='store_true',
         help="show progress")
+    argparser.add_argument("--rebuild-index",
+        action="store_true",
+        help=f"rebuild the index of the result directories ({sb.index.INDEX_DIR}) from the directory tree")
     argparser.add_argument("results",
         nargs="+",
         metavar="DIR",
@@ -72,14 +111,17 @@ def main():
 
     args = argparser.parse_args()
 
-    results = set()
-    for r in args.results:
-        for path,_,files in os.walk(r):
-            if sb.cfg.TASK_LOG in files:
-                results.add(path)
+    results = sb.index.result_dirs(args.results, args.rebuild_index)
+
+    # results of these tools cannot be parsed
+    sb.registry.get()
+    for id,msg in sorted(sb.registry.problems.items()):
+        if not args.tools or id in args.tools or id.split("/")[0] in args.tools:
+            print(f"{id}: {msg}", file=sys.stderr)
 
-    # spawn processes, instead of forking, to have same behavior under Linux and MacOS
-    mp = multiprocessing.get_context("spawn")
+    # fork the workers from a server with all parsers preloaded, or spawn them (but never fork
+    # the main process), to have the same behavior under Linux and MacOS
+    mp = sb.parsing.context()
 
     taskqueue = mp.Queue()
     for r in sorted(results):
@@ -87,7 +129,7 @@ def main():
     for _ in range(args.processes):
         taskqueue.put(None)
 
-    reparsers = [ mp.Process(target=reparser, args=(taskqueue,args.sarif,args.v)) for _ in range(args.processes) ]
+    reparsers = [ mp.Process(target=reparser, args=(taskqueue,args.sarif,args.v,args.force,set(args.tools),args.compact_json)) for _ in range(args.processes) ]
     for r in reparsers:
         r.start()
     for r in reparsers:
@@ -0,0 +1,154 @@
+import argparse, csv, os, sys, multiprocessing
+import sb.cfg, sb.io, sb.index
+
+# per-task metrics, from the task log; all but the duration need --stats-interval
+METRICS = ("duration", "cpu_time", "cpu_share", "memory_peak", "pids_peak", "io_read", "io_write", "net_rx", "net_tx")
+
+# quantiles reported for each metric
+QUANTILES = (("min", 0.0), ("p50", 0.5), ("p90", 0.9), ("p95", 0.95), ("max", 1.0))
+
+BYTE_METRICS = ("memory_peak", "io_read", "io_write", "net_rx", "net_tx")
+
+def main():
+    argparser = argparse.ArgumentParser(
+        prog="resources",
+        description="Report the distribution of the duration and the resource usage of the tasks, per tool.")
+    argparser.add_argument("-v",
+        action='store_true',
+        help="verbose: show progress")
+    argparser.add_argument("--csv",
+        action='store_true',
+        help="write the report in csv format, with raw numbers (bytes and seconds)")
+    argparser.add_argument("--processes",
+        type=int,
+        metavar="N",
+        default=1,
+        help="number of parallel processes reading the results (default 1)")
+    argparser.add_argument("--rebuild-index",
+        action="store_true",
+        help=f"rebuild the index of the result directories ({sb.index.INDEX_DIR}) from the directory tree")
+    argparser.add_argument("results",
+        nargs="+",
+        metavar="DIR",
+        help="directories containing the run results")
+
+    if len(sys.argv)==1:
+        argparser.print_help(sys.stderr)
+        sys.exit(1)
+
+    args = argparser.parse_args()
+
+    results = sb.index.result_dirs(args.results, args.rebuild_index)
+    per_tool = collect(results, args.processes, args.v)
+
+    header = ["tool", "mode", "metric", "tasks"] + [ q for q,_ in QUANTILES ]
+    rows = []
+    for (toolid,toolmode),metrics in sorted(per_tool.items()):
+        for metric in METRICS:
+            values = metrics[metric]
+            if not values:
+                continue
+            qs = [ quantile(values, p) for _,p in QUANTILES ]
+            if not args.csv:
+                qs = [ fmt(metric, q) for q in qs ]
+            rows.append([toolid, toolmode, metric, len(values)] + qs)
+
+    if args.csv:
+        csv_out = csv.writer(sys.stdout)
+        csv_out.writerow(header)
+        csv_out.writerows(rows)
+    else:
+        rows = [ header ] + [ [ str(c) for c in row ] for row in rows ]
+        widths = [ max(len(row[i]) for row in rows) for i in range(len(header)) ]
+        for row in rows:
+            print("  ".join(c.ljust(w) if i < 3 else c.rjust(w) for i,(c,w) in enumerate(zip(row, widths))))
+
+
+
+def collect(results, processes, verbose=False):
+    """Read the task logs in the result directories; return a dict mapping
+    (tool id, tool mode) to a dict mapping each of METRICS to a list of values."""
+    per_tool = {}
+    if processes > 1:
+        # spawn processes (instead of forking), for identical behavior on Linux and MacOS
+        mp = multiprocessing.get_context("spawn")
+        pool = mp.Pool(processes)
+        task_logs = pool.imap(read_task_log, sorted(results), chunksize=16)
+    else:
+        pool = None
+        task_logs = map(read_task_log, sorted(results))
+    try:
+        for r,task_log,msg in task_logs:
+            if verbose:
+                print(r, file=sys.stderr)
+            if msg:
+                print(msg, file=sys.stderr)
+                continue
+            if task_log["result"].get("precheck"):
+                # the tool did not run
+                continue
+            key = (task_log["tool"]["id"], task_log["tool"]["mode"])
+            metrics = per_tool.setdefault(key, { m: [] for m in METRICS })
+            for m,v in task_metrics(task_log).items():
+                metrics[m].append(v)
+    finally:
+        if pool:
+            pool.close()
+            pool.join()
+    return per_tool
+
+
+
+def read_task_log(r):
+    """Read the task log in directory r; return r, the task log, and an error message."""
+    try:
+        return r, sb.io.read_json(os.path.join(r,sb.cfg.TASK_LOG)), None
+    except Exception as e:
+        return r, None, f"Cannot read task log: {e}"
+
+
+
+def task_metrics(task_log):
+    """The values of METRICS available in the task log."""
+    metrics = {}
+    duration = task_log["result"].get("duration")
+    if duration is not None:
+        metrics["duration"] = duration
+    resources = task_log.get("resources")
+    if resources:
+        for m in METRICS:
+            if m in resources:
+                metrics[m] = resources[m]
+        if duration:
+            metrics["cpu_share"] = resources["cpu_time"] / duration
+    return metrics
+
+
+
+def quantile(values, p):
+    """The p-quantile of values, interpolating linearly between neighbours."""
+    vs = sorted(values)
+    i = p * (len(vs) - 1)
+    lo = int(i)
+    hi = min(lo + 1, len(vs) - 1)
+    return vs[lo] + (vs[hi] - vs[lo]) * (i - lo)
+
+
+
+def fmt(metric, v):
+    if metric in BYTE_METRICS:
+        for unit in ("", "k", "m"):
+            if v < 1024:
+                return f"{v:.0f}{unit}" if unit == "" else f"{v:.1f}{unit}"
+            v /= 1024
+        return f"{v:.1f}g"
+    if metric in ("duration", "cpu_time"):
+        return f"{v:.1f}s"
+    if metric == "cpu_share":
+        return f"{v:.2f}"
+    return f"{v:.0f}"
+
+
+
+if __name__ == '__main__':
+    sys.exit(main())
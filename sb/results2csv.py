@@ -1,10 +1,24 @@
-import argparse, csv, os, sys
-import sb.cfg, sb.io, sb.utils
+import argparse, csv, os, sys, multiprocessing, functools
+import sb.cfg, sb.io, sb.index, sb.utils
 
 FIELDS = (
     "filename", "basename", "toolid", "toolmode", "parser_version", "runid",
     "start", "duration", "exit_code",  "findings", "infos", "errors", "fails")
 
+# durations of the phases of a task in seconds, see "timings" in the task log and the parser output;
+# empty for phases that did not take place
+TIMING_FIELDS = (
+    "time_volume", "time_create", "time_start", "time_run", "time_logs", "time_archive",
+    "time_teardown", "time_budget", "time_retry", "time_write", "time_parse")
+
+# fields not included by default, for compatibility with existing csv files and databases
+EXTRA_FIELDS = ("contract",) + TIMING_FIELDS
+
+LIST_FIELDS = ("findings", "infos", "errors", "fails")
+
+# fields taken from the parser output; the other ones come from the task log
+PARSER_FIELDS = ("parser_version", "time_parse") + LIST_FIELDS
+
 def main():
     argparser = argparse.ArgumentParser(
         prog="results2csv",
@@ -15,20 +29,35 @@ def main():
     argparser.add_argument("-v",
         action='store_true',
         help="verbose: show progress")
+    argparser.add_argument("-a",
+        action='store_true',
+        help="aggregate the results of per-contract tasks into one line per file")
     argparser.add_argument("-f",
         nargs="+",
         metavar="FIELD",
         type=str,
-        choices=FIELDS,
+        choices=FIELDS+EXTRA_FIELDS,
         default=FIELDS,
-        help=f"fields to include in the csv output; one or more of {', '.join(FIELDS)} (default: all)")
+        help=f"fields to include in the csv output; one or more of {', '.join(FIELDS+EXTRA_FIELDS)} (default: {', '.join(FIELDS)})")
     argparser.add_argument("-x",
         nargs="+",
         metavar="FIELD",
         type=str,
-        choices=FIELDS,
+        choices=FIELDS+EXTRA_FIELDS,
         default=[],
-        help=f"fields to exclude from csv output; one or more of {', '.join(FIELDS)} (default: none excluded)")
+        help=f"fields to exclude from csv output; one or more of {', '.join(FIELDS+EXTRA_FIELDS)} (default: none excluded)")
+    argparser.add_argument("--processes",
+        type=int,
+        metavar="N",
+        default=1,
+        help="number of parallel processes reading the results (default 1); the output order is unaffected")
+    argparser.add_argument("--state",
+        metavar="FILE",
+        help="incremental export: skip the result directories listed in FILE, and add the exported ones to it;"
+            " the header line is omitted if FILE exists; cannot be combined with -a")
+    argparser.add_argument("--rebuild-index",
+        action="store_true",
+        help=f"rebuild the index of the result directories ({sb.index.INDEX_DIR}) from the directory tree")
     argparser.add_argument("results",
         nargs="+",
         metavar="DIR",
@@ -40,30 +69,76 @@ def main():
 
     args = argparser.parse_args()
 
+    if args.a and args.state:
+        # the tasks of a file may be split across exports, yielding several partial lines
+        argparser.error("option -a cannot be combined with --state")
+
     fields = [ f for f in args.f if f not in args.x ]
 
-    results = set()
-    for r in args.results:
-        for path,_,files in os.walk(r):
-            if sb.cfg.TASK_LOG in files:
-                results.add(path)
+    results = sb.index.result_dirs(args.results, args.rebuild_index)
+
+    continued = args.state and os.path.exists(args.state)
+    if continued:
+        exported = set(sb.io.read_lines(args.state))
+        results = [ r for r in results if os.path.abspath(r) not in exported ]
 
     csv_out = csv.writer(sys.stdout)
-    csv_out.writerow(fields)
-    for r in sorted(results):
-        if args.v:
-            print(r, file=sys.stderr)
-        try:
-            task_log = sb.io.read_json(os.path.join(r,sb.cfg.TASK_LOG))
-        except Exception as e:
-            print(f"Cannot read task log: {e}", file=sys.stderr)
-            continue
+    if not continued:
+        csv_out.writerow(fields)
+
+    # the parser output is only read if needed
+    read = functools.partial(read_result, parser_output=any(f in PARSER_FIELDS for f in fields))
+    new_exported = []
+    per_file = {}
+    if args.processes > 1:
+        # spawn processes (instead of forking), for identical behavior on Linux and MacOS
+        mp = multiprocessing.get_context("spawn")
+        pool = mp.Pool(args.processes)
+        data_results = pool.imap(read, sorted(results), chunksize=16)
+    else:
+        pool = None
+        data_results = map(read, sorted(results))
+    try:
+        for r,data,msg in data_results:
+            if args.v:
+                print(r, file=sys.stderr)
+            if msg:
+                print(msg, file=sys.stderr)
+                continue
+            new_exported.append(os.path.abspath(r))
+            if args.a and data["contract"]:
+                key = (data["filename"], data["toolid"], data["toolmode"], data["parser_version"], data["runid"])
+                per_file.setdefault(key, []).append(data)
+            else:
+                csv_out.writerow(dict2csv(data, args.p, fields))
+    finally:
+        if pool:
+            pool.close()
+            pool.join()
+    for key in sorted(per_file):
+        csv_out.writerow(dict2csv(aggregate(per_file[key]), args.p, fields))
+
+    if args.state:
+        with open(args.state, "a", encoding="utf-8") as f:
+            for r in new_exported:
+                print(r, file=f)
+
+
+
+def read_result(r, parser_output):
+    """Read the result in directory r; return r, the data as dict, and an error message."""
+    try:
+        task_log = sb.io.read_json(os.path.join(r,sb.cfg.TASK_LOG))
+    except Exception as e:
+        return r, None, f"Cannot read task log: {e}"
+    if parser_output:
         try:
             parser_output = sb.io.read_json(os.path.join(r,sb.cfg.PARSER_OUTPUT))
         except Exception as e:
-            print(f"Cannot read parsed output; use 'reparse' to generate it.\n{e}", file=sys.stderr)
-            continue
-        csv_out.writerow(data2csv(task_log, parser_output, args.p, fields))
+            return r, None, f"Cannot read parsed output; use 'reparse' to generate it.\n{e}"
+    else:
+        parser_output = None
+    return r, data2dict(task_log, parser_output), None
 
 
 
@@ -86,8 +161,17 @@ def list2excel(l):
     return ",".join(es)
 
 def data2csv(task_log, parser_output, postgres, fields):
-    csv = {
+    return dict2csv(data2dict(task_log, parser_output), postgres, fields)
+
+def data2dict(task_log, parser_output):
+    """parser_output: dict, or None if the fields taken from it are not needed"""
+    if parser_output is None:
+        parser_output = { "parser": { "version": None }, "findings": [], "infos": [], "errors": [], "fails": [] }
+    timings = dict(task_log.get("timings") or {})
+    timings.update(parser_output.get("timings") or {})
+    data = {
         "filename": task_log["filename"],
+        "contract": task_log.get("contract"),
         "basename": os.path.basename(task_log["filename"]),
         "toolid": task_log["tool"]["id"],
         "toolmode": task_log["tool"]["mode"],
@@ -102,13 +186,39 @@ def data2csv(task_log, parser_output, postgres, fields):
         "errors": parser_output["errors"],
         "fails": parser_output["fails"],
     }
-    for f in ("findings", "infos", "errors", "fails"):
+    for f in TIMING_FIELDS:
+        data[f] = timings.get(f[len("time_"):])
+    return data
+
+def dict2csv(data, postgres, fields):
+    csv = dict(data)
+    for f in LIST_FIELDS:
         if postgres:
             csv[f] = list2postgres(csv[f])
         else:
             csv[f] = list2excel(csv[f])
     return [ csv[f] for f in fields ]
 
+def aggregate(data):
+    """Combine the results of the per-contract tasks for a file into a single result.
+
+    The analysis of the file starts with the first task, takes the sum of all durations,
+    and the lists of findings etc. are merged. The exit code is the first non-zero one.
+    The durations of the phases are summed up, too.
+    """
+    data = sorted(data, key=lambda d: d["contract"])
+    agg = dict(data[0])
+    agg["contract"] = ",".join(d["contract"] for d in data)
+    agg["start"] = min(d["start"] for d in data)
+    agg["duration"] = sum(d["duration"] for d in data)
+    agg["exit_code"] = next((d["exit_code"] for d in data if d["exit_code"] != 0), 0)
+    for f in LIST_FIELDS:
+        agg[f] = sorted(set().union(*(d[f] for d in data)))
+    for f in TIMING_FIELDS:
+        ts = [ d[f] for d in data if d[f] is not None ]
+        agg[f] = sum(ts) if ts else None
+    return agg
+
 
 if __name__ == '__main__':
     sys.exit(main())
@@ -0,0 +1,199 @@
+import argparse, os, sys, multiprocessing
+import sb.cfg, sb.io, sb.index, sb.results2csv, sb.utils
+
+CHUNK = 10000 # rows per row group; the writers keep at most this many rows in memory
+
+TASKS = "tasks.parquet"
+FINDINGS = "findings.parquet"
+
+# location and other details of findings
+FINDING_FIELDS = ("function", "line", "line_end", "column", "column_end", "address", "address_end", "severity")
+
+def main():
+    argparser = argparse.ArgumentParser(
+        prog="results2parquet",
+        description=f"Write the results of runs to the Parquet files {TASKS} (one row per task) and {FINDINGS} (one row per finding).")
+    argparser.add_argument("-v",
+        action='store_true',
+        help="verbose: show progress")
+    argparser.add_argument("-o",
+        metavar="DIR",
+        default=".",
+        help="folder for the Parquet files (default: current folder)")
+    argparser.add_argument("--processes",
+        type=int,
+        metavar="N",
+        default=1,
+        help="number of parallel processes reading the results (default 1)")
+    argparser.add_argument("--rebuild-index",
+        action="store_true",
+        help=f"rebuild the index of the result directories ({sb.index.INDEX_DIR}) from the directory tree")
+    argparser.add_argument("results",
+        nargs="+",
+        metavar="DIR",
+        help="directories containing the run results")
+
+    if len(sys.argv)==1:
+        argparser.print_help(sys.stderr)
+        sys.exit(1)
+
+    args = argparser.parse_args()
+
+    try:
+        import pyarrow, pyarrow.parquet
+    except ImportError:
+        print("results2parquet needs the Python package 'pyarrow' (pip install pyarrow)", file=sys.stderr)
+        sys.exit(1)
+
+    results = sb.index.result_dirs(args.results, args.rebuild_index)
+
+    os.makedirs(args.o, exist_ok=True)
+    tasks_schema, findings_schema = schemas(pyarrow)
+    tasks = Writer(pyarrow, os.path.join(args.o, TASKS), tasks_schema)
+    findings = Writer(pyarrow, os.path.join(args.o, FINDINGS), findings_schema)
+
+    if args.processes > 1:
+        # spawn processes (instead of forking), for identical behavior on Linux and MacOS
+        mp = multiprocessing.get_context("spawn")
+        pool = mp.Pool(args.processes)
+        rows = pool.imap(read_rows, sorted(results), chunksize=16)
+    else:
+        pool = None
+        rows = map(read_rows, sorted(results))
+    try:
+        for r,task_row,finding_rows,msg in rows:
+            if args.v:
+                print(r, file=sys.stderr)
+            if msg:
+                print(msg, file=sys.stderr)
+                continue
+            tasks.append(task_row)
+            for f in finding_rows:
+                findings.append(f)
+    finally:
+        if pool:
+            pool.close()
+            pool.join()
+        tasks.close()
+        findings.close()
+
+
+
+def schemas(pa):
+    """Schemas of the task and the findings table; repetitive strings are dictionary-encoded."""
+    category = pa.dictionary(pa.int32(), pa.string())
+    strings = pa.list_(pa.string())
+    tasks = pa.schema([
+        ("rdir", pa.string()),
+        ("filename", pa.string()),
+        ("basename", pa.string()),
+        ("contract", pa.string()),
+        ("toolid", category),
+        ("toolmode", category),
+        ("parser_version", category),
+        ("runid", category),
+        ("start", pa.float64()),
+        ("duration", pa.float64()),
+        ("exit_code", pa.int64()),
+        ("findings", strings),
+        ("infos", strings),
+        ("errors", strings),
+        ("fails", strings),
+    ])
+    findings = pa.schema([
+        ("rdir", pa.string()),
+        ("filename", pa.string()),
+        ("contract", pa.string()),
+        ("toolid", category),
+        ("toolmode", category),
+        ("name", category),
+        ("function", pa.string()),
+        ("line", pa.int64()),
+        ("line_end", pa.int64()),
+        ("column", pa.int64()),
+        ("column_end", pa.int64()),
+        ("address", pa.int64()),
+        ("address_end", pa.int64()),
+        ("severity", category),
+    ])
+    return tasks, findings
+
+
+
+class Writer:
+    """Collects rows column-wise and writes them as row groups of CHUNK rows."""
+
+    def __init__(self, pa, fn, schema):
+        self.pa = pa
+        self.schema = schema
+        self.columns = { f: [] for f in schema.names }
+        self.rows = 0
+        self.writer = pa.parquet.ParquetWriter(fn, schema)
+
+    def append(self, row):
+        for f,c in self.columns.items():
+            c.append(row.get(f))
+        self.rows += 1
+        if self.rows >= CHUNK:
+            self.flush()
+
+    def flush(self):
+        if self.rows:
+            table = self.pa.Table.from_pydict(self.columns, schema=self.schema)
+            self.writer.write_table(table)
+        self.columns = { f: [] for f in self.schema.names }
+        self.rows = 0
+
+    def close(self):
+        self.flush()
+        self.writer.close()
+
+
+
+def to_int(v):
+    """v as integer, or None if it is not one, like a line range reported by some tools."""
+    try:
+        return int(v)
+    except (TypeError, ValueError):
+        pass
+    try:
+        # hex numbers like addresses
+        return int(v, 0)
+    except (TypeError, ValueError):
+        return None
+
+
+
+def read_rows(r):
+    """Read the result in directory r; return r, the task row, the finding rows and an error message."""
+    try:
+        task_log = sb.io.read_json(os.path.join(r,sb.cfg.TASK_LOG))
+    except Exception as e:
+        return r, None, None, f"Cannot read task log: {e}"
+    try:
+        parser_output = sb.io.read_json(os.path.join(r,sb.cfg.PARSER_OUTPUT))
+    except Exception as e:
+        return r, None, None, f"Cannot read parsed output; use 'reparse' to generate it.\n{e}"
+    task_row = sb.results2csv.data2dict(task_log, parser_output)
+    task_row["rdir"] = r
+    finding_rows = []
+    for finding in parser_output["findings"]:
+        finding_row = { f: (None if finding.get(f) is None else
+                            str(finding[f]) if f in ("function", "severity") else
+                            to_int(finding[f]))
+                        for f in FINDING_FIELDS }
+        finding_row.update({
+            "rdir": r,
+            "filename": finding.get("filename", task_row["filename"]),
+            "contract": finding.get("contract"),
+            "toolid": task_row["toolid"],
+            "toolmode": task_row["toolmode"],
+            "name": sb.utils.str2label(finding["name"]),
+        })
+        finding_rows.append(finding_row)
+    return r, task_row, finding_rows, None
+
+
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -0,0 +1,286 @@
+import argparse, os, sys, struct, hashlib, multiprocessing
+import sb.io, sb.index, sb.results2csv, sb.results2parquet, sb.errors
+
+CHUNK = 10000 # average results per chunk; each chunk is loaded in a transaction of its own
+MAX_CHUNK = 4 * CHUNK
+
+KEY = ("filename", "toolid", "toolmode", "parser_version", "runid")
+
+# columns of the staging tables and their types in binary COPY streams
+RESULTS = (
+    ("filename", "text"),
+    ("basename", "text"),
+    ("toolid", "text"),
+    ("toolmode", "text"),
+    ("parser_version", "text"),
+    ("runid", "text"),
+    ("start", "float8"),
+    ("duration", "float8"),
+    ("exit_code", "int4"),
+    ("findings", "text[]"),
+    ("infos", "text[]"),
+    ("errors", "text[]"),
+    ("fails", "text[]"),
+)
+
+FINDINGS = (
+    ("filename", "text"),
+    ("toolid", "text"),
+    ("toolmode", "text"),
+    ("parser_version", "text"),
+    ("runid", "text"),
+    ("contract", "text"),
+    ("name", "text"),
+    ("function", "text"),
+    ("line", "int4"),
+    ("line_end", "int4"),
+    ("column", "int4"),
+    ("column_end", "int4"),
+    ("address", "int8"),
+    ("address_end", "int8"),
+    ("severity", "text"),
+)
+
+SQL_TYPES = {
+    "text": "TEXT",
+    "int4": "INTEGER",
+    "int8": "BIGINT",
+    "float8": "DOUBLE PRECISION",
+    "text[]": "TEXT[]",
+}
+
+def main():
+    argparser = argparse.ArgumentParser(
+        prog="results2postgres",
+        description="Write the results of runs as PostgreSQL COPY streams for the tables 'results' and 'findings'"
+            " (see templates/results.sql), together with a psql script loading them.")
+    argparser.add_argument("-v",
+        action='store_true',
+        help="verbose: show progress")
+    argparser.add_argument("-o",
+        metavar="DIR",
+        default=".",
+        help="folder for the COPY streams and the script load.sql (default: current folder)")
+    argparser.add_argument("--binary",
+        action="store_true",
+        help="write COPY streams in binary instead of text format")
+    argparser.add_argument("--processes",
+        type=int,
+        metavar="N",
+        default=1,
+        help="number of parallel processes reading the results (default 1)")
+    argparser.add_argument("--rebuild-index",
+        action="store_true",
+        help=f"rebuild the index of the result directories ({sb.index.INDEX_DIR}) from the directory tree")
+    argparser.add_argument("results",
+        nargs="+",
+        metavar="DIR",
+        help="directories containing the run results")
+
+    if len(sys.argv)==1:
+        argparser.print_help(sys.stderr)
+        sys.exit(1)
+
+    args = argparser.parse_args()
+
+    results = sb.index.result_dirs(args.results, args.rebuild_index)
+
+    os.makedirs(args.o, exist_ok=True)
+    fmt = "binary" if args.binary else "text"
+    chunks = []
+    chunk = []
+    def write():
+        if chunk:
+            chunks.append(write_chunk(args.o, len(chunks), chunk, args.binary))
+            chunk.clear()
+    def add(rdir, task_row, finding_rows):
+        chunk.append((task_row, finding_rows))
+        if chunk_ends(rdir) or len(chunk) >= MAX_CHUNK:
+            write()
+
+    # the per-contract tasks of a file, combined into one row; their result dirs are adjacent when sorted
+    group_key, group, grouped = None, [], set()
+    def add_group():
+        if group:
+            task_row = sb.results2csv.aggregate([ t for _,t,_ in group ])
+            finding_rows = [ f for _,_,fs in group for f in fs ]
+            add(group[0][0], task_row, finding_rows)
+            group.clear()
+
+    if args.processes > 1:
+        # spawn processes (instead of forking), for identical behavior on Linux and MacOS
+        mp = multiprocessing.get_context("spawn")
+        pool = mp.Pool(args.processes)
+        rows = pool.imap(sb.results2parquet.read_rows, sorted(results), chunksize=16)
+    else:
+        pool = None
+        rows = map(sb.results2parquet.read_rows, sorted(results))
+    try:
+        for r,task_row,finding_rows,msg in rows:
+            if args.v:
+                print(r, file=sys.stderr)
+            if msg:
+                print(msg, file=sys.stderr)
+                continue
+            if task_row["contract"]:
+                # the table has one row per file, like results2csv -a
+                key = tuple(task_row[k] for k in KEY)
+                if key != group_key:
+                    add_group()
+                    if key in grouped:
+                        # loaded in a transaction of its own, as one INSERT cannot update a row twice
+                        print(f"{r}: not adjacent to the other contracts of {key[0]}, their row is replaced", file=sys.stderr)
+                        write()
+                    group_key = key
+                    grouped.add(key)
+                group.append((r, task_row, finding_rows))
+                continue
+            add(r, task_row, finding_rows)
+    finally:
+        if pool:
+            pool.close()
+            pool.join()
+    add_group()
+    write()
+
+    sb.io.write_txt(os.path.join(args.o, "load.sql"), load_script(chunks, fmt))
+
+
+
+def chunk_ends(rdir):
+    """Whether a chunk ends after rdir, about every CHUNK results.
+
+    The boundaries depend on the result directories only, so adding or
+    removing results changes only the chunks they belong to, and a new
+    export of otherwise unchanged results skips the other chunks."""
+    h = hashlib.sha1(rdir.encode("utf-8")).digest()
+    return int.from_bytes(h[:4], "big") % CHUNK == 0
+
+
+
+def write_chunk(d, i, chunk, binary):
+    """Write the COPY streams for the results and findings of a chunk.
+
+    Returns the names of the two files and a hash of their contents, which
+    identifies the chunk when loading it."""
+    ext = "bin" if binary else "copy"
+    encode = copy_binary if binary else copy_text
+    results_rows = [ [ t[c] for c,_ in RESULTS ] for t,_ in chunk ]
+    findings_rows = []
+    for t,fs in chunk:
+        for f in fs:
+            f = dict(f, parser_version=t["parser_version"], runid=t["runid"])
+            findings_rows.append([ f.get(c) for c,_ in FINDINGS ])
+    h = hashlib.sha1()
+    fns = []
+    for table,columns,rows in (("results", RESULTS, results_rows), ("findings", FINDINGS, findings_rows)):
+        data = encode(columns, rows)
+        fn = f"{table}.{i:05}.{ext}"
+        sb.io.write_bin(os.path.join(d, fn), data)
+        h.update(data)
+        fns.append(fn)
+    return fns[0], fns[1], h.hexdigest()
+
+
+
+def copy_text(columns, rows):
+    lines = []
+    for row in rows:
+        lines.append("\t".join(text_value(v, t) for v,(_,t) in zip(row, columns)))
+    return "".join(line + "\n" for line in lines).encode("utf-8")
+
+def text_value(v, t):
+    if v is None:
+        return "\\N"
+    if t == "text[]":
+        v = "{" + ",".join('"' + e.replace("\\", "\\\\").replace('"', '\\"') + '"' for e in v) + "}"
+    elif t == "float8":
+        v = repr(float(v))
+    else:
+        v = str(v)
+    return v.replace("\\", "\\\\").replace("\t", "\\t").replace("\n", "\\n").replace("\r", "\\r")
+
+
+PGCOPY_HEADER = b"PGCOPY\n\xff\r\n\x00" + struct.pack(">ii", 0, 0)
+PGCOPY_TRAILER = struct.pack(">h", -1)
+TEXT_OID = 25
+
+def copy_binary(columns, rows):
+    out = [ PGCOPY_HEADER ]
+    for row in rows:
+        out.append(struct.pack(">h", len(columns)))
+        for v,(_,t) in zip(row, columns):
+            if v is None:
+                out.append(struct.pack(">i", -1))
+                continue
+            b = binary_value(v, t)
+            out.append(struct.pack(">i", len(b)))
+            out.append(b)
+    out.append(PGCOPY_TRAILER)
+    return b"".join(out)
+
+def binary_value(v, t):
+    if t == "text":
+        return str(v).encode("utf-8")
+    if t == "int4":
+        return struct.pack(">i", v)
+    if t == "int8":
+        return struct.pack(">q", v)
+    if t == "float8":
+        return struct.pack(">d", v)
+    if t == "text[]":
+        if not v:
+            return struct.pack(">iii", 0, 0, TEXT_OID)
+        out = [ struct.pack(">iiiii", 1, 0, TEXT_OID, len(v), 1) ]
+        for e in v:
+            b = e.encode("utf-8")
+            out.append(struct.pack(">i", len(b)))
+            out.append(b)
+        return b"".join(out)
+    raise sb.errors.InternalError(f"Unknown column type {t}")
+
+
+
+def load_script(chunks, fmt):
+    """psql script loading the chunks; chunks loaded before are skipped, rows present already are updated."""
+    key = ", ".join(KEY)
+    lines = [
+        "-- load with: psql -f load.sql (in this folder)",
+        "\\set ON_ERROR_STOP on",
+        "CREATE TABLE IF NOT EXISTS smartbugs_chunks (chunk TEXT PRIMARY KEY, loaded TIMESTAMP DEFAULT now());",
+        f"CREATE TEMP TABLE results_staging ({', '.join(f'{quote(c)} {SQL_TYPES[t]}' for c,t in RESULTS)});",
+        f"CREATE TEMP TABLE findings_staging ({', '.join(f'{quote(c)} {SQL_TYPES[t]}' for c,t in FINDINGS)});",
+    ]
+    results_columns = ", ".join(c for c,_ in RESULTS)
+    findings_columns = ", ".join(quote(c) for c,_ in FINDINGS)
+    updates = ", ".join(f"{c} = EXCLUDED.{c}" for c,_ in RESULTS if c not in KEY)
+    for results_fn, findings_fn, chunk in chunks:
+        lines += [
+            "",
+            f"SELECT NOT EXISTS (SELECT 1 FROM smartbugs_chunks WHERE chunk = '{chunk}') AS todo \\gset",
+            "\\if :todo",
+            f"\\echo loading {results_fn}, {findings_fn}",
+            "BEGIN;",
+            f"\\copy results_staging FROM '{results_fn}' WITH (FORMAT {fmt})",
+            f"\\copy findings_staging FROM '{findings_fn}' WITH (FORMAT {fmt})",
+            f"INSERT INTO results ({results_columns}) SELECT {results_columns} FROM results_staging"
+                f" ON CONFLICT ({key}) DO UPDATE SET {updates};",
+            f"DELETE FROM findings f USING results_staging r WHERE {' AND '.join(f'f.{c} = r.{c}' for c in KEY)};",
+            f"INSERT INTO findings ({findings_columns}) SELECT {findings_columns} FROM findings_staging;",
+            f"INSERT INTO smartbugs_chunks (chunk) VALUES ('{chunk}');",
+            "TRUNCATE results_staging, findings_staging;",
+            "COMMIT;",
+            "\\else",
+            f"\\echo skipping {results_fn}, {findings_fn} (loaded before)",
+            "\\endif",
+        ]
+    return lines
+
+def quote(c):
+    # 'column' is a reserved word
+    return f'"{c}"' if c == "column" else c
+
+
+
+if __name__ == '__main__':
+    sys.exit(main())
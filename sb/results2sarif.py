@@ -0,0 +1,53 @@
+import argparse, os, sys
+import sb.cfg, sb.io, sb.index, sb.sarif
+
+def main():
+    argparser = argparse.ArgumentParser(
+        prog="results2sarif",
+        description="Merge the results of runs into a single SARIF file, with one run per tool.")
+    argparser.add_argument("-v",
+        action='store_true',
+        help="verbose: show progress")
+    argparser.add_argument("-o",
+        metavar="FILE",
+        default="results.sarif",
+        help="SARIF file to write (default: results.sarif)")
+    argparser.add_argument("--rebuild-index",
+        action="store_true",
+        help=f"rebuild the index of the result directories ({sb.index.INDEX_DIR}) from the directory tree")
+    argparser.add_argument("results",
+        nargs="+",
+        metavar="DIR",
+        help="directories containing the run results")
+
+    if len(sys.argv)==1:
+        argparser.print_help(sys.stderr)
+        sys.exit(1)
+
+    args = argparser.parse_args()
+
+    results = sb.index.result_dirs(args.results, args.rebuild_index)
+
+    merger = sb.sarif.Merger(args.o)
+    try:
+        for r in sorted(results):
+            if args.v:
+                print(r, file=sys.stderr)
+            try:
+                task_log = sb.io.read_json(os.path.join(r,sb.cfg.TASK_LOG))
+            except Exception as e:
+                print(f"Cannot read task log: {e}", file=sys.stderr)
+                continue
+            try:
+                parser_output = sb.io.read_json(os.path.join(r,sb.cfg.PARSER_OUTPUT))
+            except Exception as e:
+                print(f"Cannot read parsed output; use 'reparse' to generate it.\n{e}", file=sys.stderr)
+                continue
+            merger.add(task_log["tool"], parser_output["findings"])
+    finally:
+        merger.close()
+
+
+
+if __name__ == '__main__':
+    sys.exit(main())
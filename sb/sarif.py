@@ -1,8 +1,18 @@
-import sb.tools, sb.utils
+import os, shutil, tempfile, threading, collections
+import sb.tools, sb.utils, sb.io
+
+SCHEMA = "https://json.schemastore.org/sarif-2.1.0.json"
+
+# prebuilt sarif rule of a finding: rule id, rule object, default message of results
+Rule = collections.namedtuple("Rule", ("id", "sarif", "message"))
+
+# tool id -> rule table (finding name -> Rule), built once per process
+# and shared by all tasks; the rules must not be modified
+rule_tables = {}
 
 def sarify(tool, findings):
     return {
-        "$schema": "https://json.schemastore.org/sarif-2.1.0.json",
+        "$schema": SCHEMA,
         "version": "2.1.0",
         "runs": [ run_info(tool, findings) ]
     }
@@ -19,7 +29,7 @@ def run_info(tool, findings):
 def tool_info(tool, fnames):
     driver = {
         "name":  tool.get("name", tool["id"]), # tool["id"] always exists
-        "rules": [ rule_info(tool["id"], fname) for fname in fnames ]
+        "rules": [ rule(tool["id"], fname).sarif for fname in sorted(fnames) ]
     }
 
     v = tool.get("version")
@@ -31,6 +41,30 @@ def tool_info(tool, fnames):
     return { "driver": driver }
 
 
+def rule_table(tool_id):
+    """Rule table of the tool, with the rules of all findings in its findings.yaml."""
+    table = rule_tables.get(tool_id)
+    if table is None:
+        sb.tools.info_finding(tool_id, None) # reads findings.yaml
+        table = { fname: compile_rule(tool_id, fname) for fname in sb.tools.info_findings[tool_id] }
+        rule_tables[tool_id] = table
+    return table
+
+
+def rule(tool_id, fname):
+    table = rule_table(tool_id)
+    r = table.get(fname)
+    if r is None:
+        # finding not described in findings.yaml
+        r = table[fname] = compile_rule(tool_id, fname)
+    return r
+
+
+def compile_rule(tool_id, fname):
+    info_finding = sb.tools.info_finding(tool_id, fname)
+    return Rule(rule_id(tool_id, fname), rule_info(tool_id, fname), info_finding.get("descr_short"))
+
+
 def rule_info(tool_id, fname):
     info_finding = sb.tools.info_finding(tool_id, fname)
 
@@ -58,18 +92,17 @@ def rule_info(tool_id, fname):
 
 
 def result_info(tool_id, finding):
-    fname = finding["name"]
-    info_finding = sb.tools.info_finding(tool_id, fname)
+    r = rule(tool_id, finding["name"])
 
     result_dict = {
-        "ruleId": rule_id(tool_id, fname),
+        "ruleId": r.id,
         "locations": [ { 
             "physicalLocation": {
                 "artifactLocation": {
                     "uri": finding["filename"]
     } } } ] }
 
-    v = result_message(finding, info_finding)
+    v = result_message(finding, r.message)
     if v: result_dict["message"] = { "text": v }
 
     v = result_level(finding)
@@ -128,10 +161,10 @@ def rule_security_severity(info_finding):
                 "")
 
 
-def result_message(finding, info_finding):
+def result_message(finding, descr_short):
     message = (
         finding.get("message")
-        or info_finding.get("descr_short")
+        or descr_short
         or finding["name"])
     severity = finding.get("severity")
     return (f"{message}\nSeverity: {severity}" if message and severity else
@@ -172,3 +205,75 @@ def result_region(finding):
             region_dict[c] = 1 + 2*int(finding[a])
     return region_dict
 
+
+
+
+class Merger:
+    """Merge the findings of many tasks into a single SARIF log with one run per tool.
+
+    The results are spooled to a temporary file per tool, next to the final
+    log; only the tool descriptions and finding names are kept in memory.
+    """
+
+    def __init__(self, fn):
+        self.fn = fn
+        d = os.path.dirname(fn)
+        if d:
+            os.makedirs(d, exist_ok=True)
+        self.spooldir = tempfile.mkdtemp(prefix=".sarif-", dir=d or ".")
+        self.runs = {} # tool id -> [tool, finding names, spool file, number of results]
+
+    def add(self, tool, findings):
+        run = self.runs.get(tool["id"])
+        if run is None:
+            spool = open(os.path.join(self.spooldir, f"{len(self.runs)}.json"), "w", encoding="utf-8")
+            run = self.runs[tool["id"]] = [tool, set(), spool, 0]
+        _,fnames,spool,n = run
+        for finding in findings:
+            fnames.add(finding["name"])
+            if n:
+                spool.write(",\n")
+            spool.write(sb.io.dumps(result_info(tool["id"], finding)))
+            n += 1
+        run[3] = n
+
+    def close(self):
+        try:
+            with open(self.fn, "w", encoding="utf-8") as f:
+                f.write(f'{{"$schema": {sb.io.dumps(SCHEMA)},\n"version": "2.1.0",\n"runs": [')
+                for i,tool_id in enumerate(sorted(self.runs)):
+                    tool,fnames,spool,_ = self.runs[tool_id]
+                    spool.close()
+                    f.write(",\n" if i else "\n")
+                    f.write(f'{{"tool": {sb.io.dumps(tool_info(tool, fnames))},\n"results": [\n')
+                    with open(spool.name, encoding="utf-8") as s:
+                        shutil.copyfileobj(s, f)
+                    f.write("\n]}")
+                f.write("\n]}\n")
+        finally:
+            for _,_,spool,_ in self.runs.values():
+                spool.close()
+            shutil.rmtree(self.spooldir, ignore_errors=True)
+
+
+
+def merger(fn, queue):
+    m = Merger(fn)
+    try:
+        while True:
+            item = queue.get()
+            if item is None:
+                break
+            tool,findings = item
+            m.add(tool, findings)
+    finally:
+        m.close()
+
+def start(fn, queue):
+    global sarif_merger
+    sarif_merger = threading.Thread(target=merger, args=(fn,queue))
+    sarif_merger.start()
+
+def stop(queue):
+    queue.put(None)
+    sarif_merger.join()
@@ -0,0 +1,123 @@
+"""Backlog of the tasks of a run, fed to the analysers via a small bounded queue.
+
+The backlog stays in the main process, so tasks can be prioritised or
+cancelled until they are dispatched. A thread of the main process keeps the
+queue topped up, and sends each analyser a None once the backlog is empty.
+
+With a feedback queue, the analysers report each task they are done with,
+possibly together with a task to be re-queued. The backlog is then only
+considered empty once no tasks are in flight any more.
+"""
+
+import heapq, itertools, threading
+
+
+
+class Scheduler:
+
+    def __init__(self, taskqueue, workers, feedback=None):
+        self.taskqueue = taskqueue # bounded, put blocks while it is full
+        self.workers = workers     # number of analysers reading from the queue
+        self.feedback = feedback   # tuples (task to re-queue or None, priority), one per dispatched task
+        self.backlog = []          # heap of (priority, sequence number, task)
+        self.in_flight = 0         # tasks dispatched, but not yet reported back
+        self.counter = itertools.count()
+        self.changed = threading.Condition()
+        self.dispatcher = threading.Thread(target=self.dispatch, daemon=True)
+        self.collector = threading.Thread(target=self.collect, daemon=True)
+
+    def add(self, task, priority=0):
+        """Add a task to the backlog; lower values of priority are dispatched first,
+        tasks with the same priority in the order they were added."""
+        with self.changed:
+            heapq.heappush(self.backlog, (priority, next(self.counter), task))
+            self.changed.notify_all()
+
+    def cancel(self, predicate=None):
+        """Remove the tasks satisfying predicate, or all tasks, from the backlog; return their number."""
+        with self.changed:
+            before = len(self.backlog)
+            if predicate is None:
+                self.backlog.clear()
+            else:
+                self.backlog = [ e for e in self.backlog if not predicate(e[2]) ]
+                heapq.heapify(self.backlog)
+            self.changed.notify_all()
+            return before - len(self.backlog)
+
+    def pending(self):
+        with self.changed:
+            return len(self.backlog)
+
+    def pop(self):
+        """Remove the next task from the backlog and return it; None if there are no more tasks."""
+        with self.changed:
+            # tasks in flight may still be re-queued
+            while not self.backlog and self.in_flight:
+                self.changed.wait()
+            if not self.backlog:
+                return None
+            if self.feedback:
+                self.in_flight += 1
+            return heapq.heappop(self.backlog)[2]
+
+    def dispatch(self):
+        while True:
+            task = self.pop()
+            if task is None:
+                break
+            self.taskqueue.put(task)
+        for _ in range(self.workers):
+            self.taskqueue.put(None)
+        if self.feedback:
+            self.feedback.put(None)
+
+    def collect(self):
+        while True:
+            try:
+                report = self.feedback.get()
+            except Exception:
+                # a report that cannot be unpickled still ends the task in flight
+                report = (None, 0)
+            if report is None:
+                return
+            task,priority = report
+            with self.changed:
+                if task:
+                    heapq.heappush(self.backlog, (priority, next(self.counter), task))
+                self.in_flight -= 1
+                self.changed.notify_all()
+
+    def start(self):
+        if self.feedback:
+            self.collector.start()
+        self.dispatcher.start()
+
+    def join(self):
+        self.dispatcher.join()
+        if self.feedback:
+            self.collector.join()
+
+
+
+class MemoryBudget:
+    """Memory limits of the containers running at the same time, in bytes, shared by the analysers.
+
+    A task waits until its limit fits into the budget. Tasks without a limit
+    count as zero, and a task exceeding the budget on its own runs alone."""
+
+    def __init__(self, mp, budget):
+        self.budget = budget
+        self.reserved = mp.Value('q', 0, lock=False) # protected by self.changed
+        self.changed = mp.Condition()
+
+    def reserve(self, amount):
+        with self.changed:
+            while self.reserved.value > 0 and self.reserved.value + amount > self.budget:
+                self.changed.wait()
+            self.reserved.value += amount
+
+    def release(self, amount):
+        with self.changed:
+            self.reserved.value -= amount
+            self.changed.notify_all()
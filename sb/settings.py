@@ -16,14 +16,26 @@ class Settings:
         self.runid = "${YEAR}${MONTH}${DAY}_${HOUR}${MIN}"
         self.overwrite = False
         self.processes = 1
+        self.min_processes = None
+        self.parsers = 1
         self.timeout = None
         self.cpu_quota = None
         self.mem_limit = None
+        self.mem_budget = None
+        self.stats_interval = None
         self.results = os.path.join("results","${TOOL}","${RUNID}","${FILENAME}")
         self.log = os.path.join("results","logs","${RUNID}.log")
+        self.db = None
+        self.merged_sarif = None
         self.json = False
         self.sarif = False
+        self.compact_json = False
         self.quiet = False
+        self.compile = False
+        self.precheck = False
+        self.per_contract = False
+        self.remappings = []
+        self.cache = os.path.join(HOME, ".cache", "smartbugs")
 
         
     def freeze(self):
@@ -54,11 +66,28 @@ class Settings:
         except KeyError as e:
             raise sb.errors.SmartBugsError(f"Unknown variable '{e}' in name of log file")
 
+        if self.db:
+            try:
+                self.db = string.Template(self.db).substitute(env, RUNID=self.runid)
+            except KeyError as e:
+                raise sb.errors.SmartBugsError(f"Unknown variable '{e}' in name of database")
+
+        if self.merged_sarif:
+            try:
+                self.merged_sarif = string.Template(self.merged_sarif).substitute(env, RUNID=self.runid)
+            except KeyError as e:
+                raise sb.errors.SmartBugsError(f"Unknown variable '{e}' in name of merged sarif file")
+
+        try:
+            self.cache = string.Template(self.cache).substitute(env)
+        except KeyError as e:
+            raise sb.errors.SmartBugsError(f"Unknown variable '{e}' in name of cache directory")
+
         self.results = string.Template(self.results).safe_substitute(env, RUNID=self.runid)
         self.results = string.Template(self.results)
 
 
-    def resultdir(self, toolid, toolmode, absfn, relfn):
+    def resultdir(self, toolid, toolmode, absfn, relfn, contract=None):
         if not self.frozen:
             raise sb.errors.InternalError("Template of result directory is accessed before settings have been frozen")
         absdir,filename = os.path.split(absfn)
@@ -66,12 +95,17 @@ class Settings:
         filebase,fileext = os.path.splitext(filename)
         fileext = fileext.replace('.','')
         try:        
-            return self.results.substitute(
+            rdir = self.results.substitute(
                 TOOL=toolid, MODE=toolmode,
                 ABSDIR=absdir, RELDIR=reldir,
-                FILENAME=filename, FILEBASE=filebase, FILEEXT=fileext)
+                FILENAME=filename, FILEBASE=filebase, FILEEXT=fileext,
+                CONTRACT=contract or "")
         except KeyError as e:
             raise sb.errors.SmartBugsError(f"Unknown variable '{e}' in template of result dir")
+        if contract and "CONTRACT" not in self.results.template:
+            # results of a single contract go into a subdirectory of the file's results
+            rdir = os.path.join(rdir, contract)
+        return rdir
 
 
     def update(self, settings):
@@ -89,11 +123,11 @@ class Settings:
         for k,v in s.items():
             k = k.replace("-", "_")
 
-            # attributes accepting None as a value
-            if k in ("timeout", "cpu_quota", "mem_limit") and v in (None, 0, "0"):
+            # attributes accepting None as a value; an empty db disables the database of the site config
+            if k in ("timeout", "cpu_quota", "mem_limit", "mem_budget", "min_processes", "stats_interval", "db", "merged_sarif") and (v in (None, 0, "0") or (k == "db" and v == "")):
                setattr(self, k, None)
 
-            elif k in ("timeout", "cpu_quota", "processes"):
+            elif k in ("timeout", "cpu_quota", "processes", "min_processes", "parsers", "stats_interval"):
                 try:
                     v = int(v)
                     assert v > 0
@@ -109,6 +143,16 @@ class Settings:
                 except Exception:
                     raise sb.errors.SmartBugsError(f"'{k}' needs to be a string or a list of strings (in {settings}).")
 
+            elif k == "remappings":
+                if not isinstance(v,list):
+                    v = [v]
+                try:
+                    v = [str(vi) for vi in v]
+                    assert all("=" in vi and vi.split("=",1)[0] for vi in v)
+                    setattr(self, k, v)
+                except Exception:
+                    raise sb.errors.SmartBugsError(f"'{k}' needs to be a string or a list of strings of the form 'prefix=path' (in {settings}).")
+
             elif k in ("files"):
                 if not isinstance(v,list):
                     v = [v]
@@ -132,14 +176,14 @@ class Settings:
                     root_specs.append((root,spec))
                 setattr(self, k, root_specs)
 
-            elif k in ("main", "runtime", "overwrite", "quiet", "json", "sarif"):
+            elif k in ("main", "runtime", "overwrite", "quiet", "json", "sarif", "compact_json", "compile", "precheck", "per_contract"):
                 try:
                     assert isinstance(v, bool)
                     setattr(self, k, v)
                 except Exception:
                     raise sb.errors.SmartBugsError(f"'{k}' needs to be a Boolean (in {settings}).")
 
-            elif k in ("results", "log"):
+            elif k in ("results", "log", "cache", "db", "merged_sarif"):
                 try:
                     setattr(self, k, str(v).replace("/",os.path.sep))
                 except Exception:
@@ -151,7 +195,7 @@ class Settings:
                 except Exception:
                     raise sb.errors.SmartBugsError(f"'{k}' needs to be a string (in {settings}).")
 
-            elif k == "mem_limit":
+            elif k in ("mem_limit", "mem_budget"):
                 try:
                     v = str(v).replace(" ","")
                     if v[-1] in "kKmMgG":
@@ -1,8 +1,10 @@
-import glob, os, operator
+import glob, os, operator, re, posixpath
 import sb.tools, sb.solidity, sb.tasks, sb.docker, sb.analysis, sb.colors, sb.logging, sb.cfg, sb.io, sb.settings, sb.errors
 
 
 
+HEXCODE = re.compile("[0-9A-Fa-f]*")
+
 def collect_files(patterns):
     files = []
     for root,spec in patterns:
@@ -68,6 +70,55 @@ def collect_tasks(files, tools, settings):
             raise sb.errors.SmartBugsError(f"{fn}: cannot load solc {solc_version} needed by {toolid}")
         return solc_version,solc_path
 
+    remappings = [ tuple(r.split("=",1)) for r in settings.remappings ]
+    imports = {}
+    def imports_of(absfn):
+        if absfn not in imports:
+            imports[absfn] = sb.solidity.get_imports(sb.io.read_lines(absfn))
+        return imports[absfn]
+
+    def resolve_imports(absfn, relfn):
+        # the project root is the directory that relfn is relative to
+        unit = posixpath.normpath(relfn.replace(os.path.sep, "/"))
+        if os.path.isabs(relfn) or unit.startswith("../"):
+            root,unit = os.path.dirname(absfn),os.path.basename(absfn)
+        else:
+            root = absfn
+            for _ in range(unit.count("/")+1):
+                root = os.path.dirname(root)
+        deps,unresolved = sb.solidity.resolve_imports(unit, root, remappings, imports_of)
+        if unresolved:
+            sb.logging.message(sb.colors.warning(
+                f"{relfn}: cannot resolve import(s) {', '.join(sorted(set(unresolved)))}"), "")
+        return unit,deps
+
+    uncompilable = set()
+    def compile(absfn, unit, deps, contractnames, solc_version, solc_path):
+        sources = { unit: sb.io.read_txt(absfn) }
+        for dep_unit,dep_absfn in deps.items():
+            sources[dep_unit] = sb.io.read_txt(dep_absfn)
+        fn,output = sb.solidity.compile_standard(sources, solc_version, solc_path, settings.cache)
+        if not fn and solc_version not in uncompilable:
+            uncompilable.add(solc_version)
+            sb.logging.message(sb.colors.warning(
+                f"Cannot run solc {solc_version} on this host, the tools will compile the contracts themselves"),
+                "")
+        deployed = sb.solidity.get_deployed_contractnames(output, unit, contractnames)
+        failed = bool(fn) and deployed is None
+        return fn, deployed, failed
+
+    def check_hex(absfn):
+        # same sanitation as when preparing the Docker volume
+        code = sb.io.read_lines(absfn)
+        code = code[0].strip() if code else ""
+        if code.startswith("0x"):
+            code = code[2:]
+        if not code:
+            return "empty bytecode"
+        if len(code)%2 != 0 or not HEXCODE.fullmatch(code):
+            return "invalid bytecode, not a hex string of even length"
+        return None
+
     def ensure_loaded(image):
         if not sb.docker.is_loaded(image):
             sb.logging.message(f"Loading docker image {image}, may take a while ...")
@@ -89,35 +140,67 @@ def collect_tasks(files, tools, settings):
         is_rtc = absfn[-4:]==".hex" and     (absfn[-7:-4]==".rt" or settings.runtime)
 
         contract = os.path.basename(absfn)[:-4]
-        pragma,contractnames = None,[]
+        pragma,contractnames,deployable = None,[],[]
+        unit,deps = os.path.basename(absfn),{}
         if is_sol:
             prg = sb.io.read_lines(absfn)
             pragma,contractnames = sb.solidity.get_pragma_contractnames(prg)
             if settings.main and contract not in contractnames:
                 exceptions.append(f"Contract '{contract}' not found in {absfn}")
+            if settings.per_contract:
+                # without compilation, the tasks are split by the declarations in the source
+                deployable = sb.solidity.get_deployable_contractnames(prg)
+            # files with imports keep their relative location in the project,
+            # the dependencies are shared by all tasks for the file
+            imports[absfn] = sb.solidity.get_imports(prg)
+            if imports[absfn]:
+                unit,deps = resolve_imports(absfn, relfn)
+
+        # compiler outputs for this file, one per solc version
+        compiled = {}
+
+        # tasks with unusable input fail without running the tool
+        hex_fail = check_hex(absfn) if settings.precheck and not is_sol else None
 
         for tool in sorted(tools, key=operator.attrgetter("id", "mode")):
             if ((is_sol and tool.mode=="solidity") or
                 (is_byc and tool.mode=="bytecode") or
                 (is_rtc and tool.mode=="runtime")):
 
-                # find unique name for result dir
-                # ought to be the same when rerunning SB with the same args,
-                # due to sorting files and tools
-                base = settings.resultdir(tool.id,tool.mode,absfn,relfn)
-                rdir = disambiguate(base)
-
                 # load resources
-                solc_version, solc_path = None,None
+                solc_version, solc_path, solc_output, deployed = None,None,None,None
+                precheck_fail = hex_fail
                 if tool.solc:
                     try:
                         solc_version, solc_path = get_solc(pragma, relfn, tool.id)
                     except Exception as e:
                         exceptions.append(e)
-                ensure_loaded(tool.image)
-
-                task = sb.tasks.Task(absfn,relfn,rdir,solc_version,solc_path,tool,settings)
-                tasks.append(task)
+                if solc_path and (settings.compile or settings.precheck or settings.per_contract):
+                    if solc_version not in compiled:
+                        compiled[solc_version] = compile(absfn, unit, deps, contractnames, solc_version, solc_path)
+                    fn, deployed, failed = compiled[solc_version]
+                    if settings.compile:
+                        solc_output = fn
+                    if settings.precheck and failed:
+                        precheck_fail = "Solidity compilation failed"
+                if not precheck_fail:
+                    ensure_loaded(tool.image)
+
+                # one task per contract, if requested and supported by the tool
+                split = (is_sol and settings.per_contract and not settings.main
+                         and not precheck_fail and tool.splittable())
+                targets = (deployed if deployed is not None else deployable) if split else []
+
+                for target in targets or [None]:
+                    # find unique name for result dir
+                    # ought to be the same when rerunning SB with the same args,
+                    # due to sorting files and tools
+                    base = settings.resultdir(tool.id,tool.mode,absfn,relfn,target)
+                    rdir = disambiguate(base)
+
+                    names = [target] if target else deployed
+                    task = sb.tasks.Task(absfn,relfn,unit,deps,target,rdir,solc_version,solc_path,solc_output,names,precheck_fail,tool,settings)
+                    tasks.append(task)
 
     report_collisions()
     if exceptions:
@@ -145,5 +228,9 @@ def main(settings: sb.settings.Settings):
     sb.logging.message("Assembling tasks ...")
     tasks = collect_tasks(files, tools, settings)
     sb.logging.message(f"{len(tasks)} tasks to execute")
+    failing = sum(1 for task in tasks if task.precheck_fail)
+    if failing:
+        sb.logging.message(sb.colors.warning(
+            f"{failing} task(s) with unusable input, will be marked as failed without running the tool"), "")
 
     sb.analysis.run(tasks, settings)
@@ -1,9 +1,19 @@
-import os,re
+import os,re,json,hashlib,posixpath
 from pathlib import Path
 
-import solcx
-# load binaries for Linux in Docker images, not for host platform
-solcx.set_target_os("linux")
+import sb.io
+
+_solcx = None
+
+def load_solcx():
+    """Import solcx on first use, as it takes a while to load."""
+    global _solcx
+    if not _solcx:
+        import solcx
+        # load binaries for Linux in Docker images, not for host platform
+        solcx.set_target_os("linux")
+        _solcx = solcx
+    return _solcx
 
 
 
@@ -11,7 +21,7 @@ VOID_START = re.compile("//|/\\*|\"|'")
 QUOTE_END = re.compile("(?<!\\\\)'")
 DQUOTE_END = re.compile('(?<!\\\\)"')
 
-def remove_comments_strings(prg):
+def remove_comments_strings(prg, keep_strings=False):
     todo = "\n".join(prg) # normalize line ends
     done = ""
     while True:
@@ -36,6 +46,8 @@ def remove_comments_strings(prg):
                 if not m2:
                     # unclosed string
                     break
+                if keep_strings:
+                    done += todo[m.start():m.end()+m2.end()]
                 todo = todo[m.end()+m2.end():]
     return done
 
@@ -53,12 +65,108 @@ def get_pragma_contractnames(prg):
 
 
 
+RE_CONTRACT_KINDS = re.compile(r'\b(abstract\s+)?(contract|library|interface)\s+([A-Za-z0-9_]*)(?:\s*{|\s+is\s)')
+
+def get_deployable_contractnames(prg):
+    """Names of the contracts in prg that are neither abstract nor libraries or interfaces.
+
+    Approximates the contracts with deployed code, if the file is not compiled."""
+    prg_wo_comments_strings = remove_comments_strings(prg)
+    return [ name for abstract,kind,name in RE_CONTRACT_KINDS.findall(prg_wo_comments_strings)
+        if kind == "contract" and not abstract ]
+
+
+
+RE_IMPORT = re.compile(r"\bimport\b([^;]*);")
+RE_STRING = re.compile(r""""([^"]*)"|'([^']*)'""")
+
+def get_imports(prg):
+    """Return the paths of the files imported by the Solidity program prg (list of lines)."""
+    prg_wo_comments = remove_comments_strings(prg, keep_strings=True)
+    imports = []
+    for statement in RE_IMPORT.findall(prg_wo_comments):
+        # the path is the only string literal in an import statement
+        m = RE_STRING.search(statement)
+        if m:
+            imports.append(m[1] if m[1] is not None else m[2])
+    return imports
+
+
+
+def resolve_imports(unit, root, remappings, imports_of):
+    """Determine the source files needed to compile a Solidity file.
+
+    Source unit names follow solc's conventions: relative imports are resolved
+    with respect to the importing unit, all other import paths are unit names
+    themselves. To locate a unit on the host, the longest matching remapping is
+    applied, and the result is taken relative to the project root.
+
+    Parameters
+    ----------
+    unit: str
+        source unit name of the file, i.e., its path relative to root, with '/' as separator
+    root: str
+        root directory of the project on the host
+    remappings: list[tuple[str,str]]
+        prefixes of unit names and their replacements
+    imports_of: Callable[[str],list[str]]
+        function returning the import paths of a file on the host, may cache the results
+
+    Returns
+    -------
+    tuple[dict[str,str],list[str]]
+        the dependencies of the file, as a mapping of unit names to host paths,
+        and the import paths that could not be resolved
+    """
+    deps, unresolved = {}, []
+    todo = [ (unit, os.path.normpath(os.path.join(root, unit))) ]
+    while todo:
+        importer, importer_path = todo.pop()
+        for path in imports_of(importer_path):
+            if path.startswith("./") or path.startswith("../"):
+                imported = posixpath.normpath(posixpath.join(posixpath.dirname(importer), path))
+            else:
+                imported = posixpath.normpath(path)
+            if imported == unit or imported in deps:
+                continue
+            if imported.startswith("../") or imported.startswith("/"):
+                # outside of the project, no place in the Docker container
+                unresolved.append(path)
+                continue
+            located = imported
+            for prefix,target in sorted(remappings, key=lambda r: len(r[0]), reverse=True):
+                if imported.startswith(prefix):
+                    located = target + imported[len(prefix):]
+                    break
+            host_path = os.path.normpath(os.path.join(root, located))
+            if not os.path.isfile(host_path):
+                unresolved.append(path)
+                continue
+            deps[imported] = host_path
+            todo.append((imported, host_path))
+    return deps, unresolved
+
+
+
+def container_remappings(unit, deps, mountdir):
+    """Remappings for solc in the container, where each unit is located at mountdir/unit.
+
+    Host-side remappings are already applied when placing the files, so one
+    remapping per top-level folder or file of the units suffices, like
+    'X/=/sb/X/'. Tools need to pass them to the compiler, as solc resolves
+    non-relative imports relative to its working directory otherwise."""
+    tops = { u.split("/")[0] + ("/" if "/" in u else "") for u in [unit] + list(deps) }
+    return [ f"{t}={mountdir}/{t}" for t in sorted(tops) ]
+
+
+
 cached_solc_versions = None
 
 def ensure_solc_versions_loaded():
     global cached_solc_versions
     if cached_solc_versions:
         return True
+    solcx = load_solcx()
     try:
         cached_solc_versions = solcx.get_installable_solc_versions()
         return True
@@ -75,6 +183,7 @@ def get_solc_version(pragma):
     pragma = re.sub(r">=0\.", r"^0.", pragma)
     # replace x.y by x.y.0
     pragma = re.sub(r"([^0-9])([0-9]+\.[0-9]+)([^0-9.]|$)", r"\1\2.0\3", pragma)
+    solcx = load_solcx()
     try:
         version = solcx.install._select_pragma_version(pragma, cached_solc_versions)
     except Exception:
@@ -90,6 +199,7 @@ def get_solc_path(version):
         return None
     if version in cached_solc_paths:
         return cached_solc_paths[version]
+    solcx = load_solcx()
     try:
         solcx.install_solc(version)
         solc_path = solcx.get_executable(version)
@@ -97,3 +207,105 @@ def get_solc_path(version):
         solc_path = None
     cached_solc_paths[version] = solc_path
     return solc_path
+
+
+
+COMPILE_SETTINGS = {
+    "optimizer": {"enabled": False},
+    "outputSelection": {
+        "*": {
+            "": [ "ast" ],
+            "*": [ "abi",
+                   "evm.bytecode.object", "evm.bytecode.sourceMap",
+                   "evm.deployedBytecode.object", "evm.deployedBytecode.sourceMap" ],
+        }
+    },
+}
+
+def compile_standard(sources, solc_version, solc_path, cache):
+    """Compile Solidity sources on the host, using the standard-json interface of solc.
+
+    The compiler output is stored in the directory 'cache', keyed by solc version and
+    the hash of the compiler input, such that each source is compiled only once.
+
+    Parameters
+    ----------
+    sources: dict[str,str]
+        maps source unit names to the contents of the source files
+    solc_version: Version
+        version of solc, used as part of the cache key
+    solc_path: str
+        path to the solc binary
+    cache: str
+        directory for the compiler outputs
+
+    Returns
+    -------
+    tuple[str,dict]|tuple[None,None]
+        path of the cached compiler output and the output itself, or (None,None)
+        if solc cannot be run on the host (wrong platform, no support for standard json)
+    """
+    input_json = {
+        "language": "Solidity",
+        "sources": { unit: {"content": content} for unit,content in sources.items() },
+        "settings": COMPILE_SETTINGS,
+    }
+    key = hashlib.sha256(json.dumps(input_json, sort_keys=True).encode("utf8")).hexdigest()
+    cache_dir = os.path.join(cache, "solc", str(solc_version))
+    fn = os.path.join(cache_dir, f"{key}.json")
+    if os.path.exists(fn):
+        try:
+            return fn, sb.io.read_json(fn)
+        except Exception:
+            pass # corrupt cache entry, compile again
+
+    solcx = load_solcx()
+    try:
+        output = solcx.compile_standard(input_json, solc_binary=solc_path)
+    except solcx.exceptions.SolcError as e:
+        # compilation errors are results worth caching, everything else indicates
+        # that the compiler cannot be used on this host
+        if not e.error_dict:
+            return None,None
+        try:
+            output = json.loads(e.stdout_data)
+        except Exception:
+            return None,None
+    except Exception:
+        return None,None
+
+    # write to a temporary file first, as the cache may be shared by concurrent runs
+    os.makedirs(cache_dir, exist_ok=True)
+    fn_tmp = f"{fn}.{os.getpid()}"
+    sb.io.write_json(fn_tmp, output)
+    os.replace(fn_tmp, fn)
+    return fn, output
+
+
+
+def get_deployed_contractnames(output, unit, contractnames=()):
+    """Determine the contracts with non-empty deployed code, from the compiler output.
+
+    Parameters
+    ----------
+    output: dict
+        output of solc in standard-json format
+    unit: str
+        source unit name of the file
+    contractnames: list[str]
+        contract names as determined by get_pragma_contractnames, used for ordering
+        the result like the source; contracts missing in this list come last
+
+    Returns
+    -------
+    list[str]|None
+        names of deployable contracts, or None if compilation failed
+    """
+    if not output or any(e.get("severity") == "error" for e in output.get("errors", [])):
+        return None
+    contracts = output.get("contracts", {}).get(unit, {})
+    deployed = { name for name,contract in contracts.items()
+                 if contract.get("evm", {}).get("deployedBytecode", {}).get("object") }
+    ordered = [ name for name in contractnames if name in deployed ]
+    ordered.extend(sorted(deployed.difference(ordered)))
+    return ordered
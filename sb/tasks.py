@@ -1,13 +1,49 @@
+# Tools and settings of the run, by which pickled tasks refer to them;
+# set by init() in each worker process, before it receives tasks
+tools = {}
+settings = None
+
+def init(run_tools, run_settings):
+    global settings
+    tools.clear()
+    for tool in run_tools:
+        tools[(tool.id, tool.mode)] = tool
+    settings = run_settings
+
+
+
 class Task:
-    def __init__(self, absfn, relfn, rdir, solc_version, solc_path, tool, settings):
+    __slots__ = ("absfn", "relfn", "unit", "deps", "contract", "rdir", "solc_version", "solc_path",
+        "solc_output", "contractnames", "precheck_fail", "tool", "settings", "mem_limit")
+
+    def __init__(self, absfn, relfn, unit, deps, contract, rdir, solc_version, solc_path, solc_output, contractnames, precheck_fail, tool, settings, mem_limit=None):
         self.absfn = absfn # absolute normalized path
         self.relfn = relfn # path within project
+        self.unit = unit   # path within /sb in the Docker container
+        self.deps = deps   # imported files, maps paths within /sb to absolute paths
+        self.contract = contract # contract to analyse, or None for all contracts in the file
         self.rdir = rdir   # directory for results
         self.solc_version = solc_version
         self.solc_path = solc_path
+        self.solc_output = solc_output # compiler output cached on the host, or None
+        self.contractnames = contractnames # deployable contracts, or None if unknown
+        self.precheck_fail = precheck_fail # reason why the tool would fail anyway, or None
         self.tool = tool
         self.settings = settings
+        self.mem_limit = mem_limit # bytes, overrides tool and settings; only set for tasks retried after running out of memory
+
+    def __reduce__(self):
+        # the tool and the settings are sent to each worker once, see init();
+        # tasks refer to the tool by id and mode
+        return (restore, (self.absfn, self.relfn, self.unit, self.deps, self.contract, self.rdir,
+            self.solc_version, self.solc_path, self.solc_output, self.contractnames, self.precheck_fail,
+            (self.tool.id, self.tool.mode), self.mem_limit))
 
     def __str__(self):
-        s = [ f"{k}: {str(v)}" for k,v in self.__dict__.items() ]
+        s = [ f"{k}: {str(getattr(self, k))}" for k in self.__slots__ ]
         return f"{{{', '.join(s)}}}"
+
+
+
+def restore(absfn, relfn, unit, deps, contract, rdir, solc_version, solc_path, solc_output, contractnames, precheck_fail, tool, mem_limit):
+    return Task(absfn, relfn, unit, deps, contract, rdir, solc_version, solc_path, solc_output, contractnames, precheck_fail, tools[tool], settings, mem_limit)
@@ -1,4 +1,4 @@
-import os, string
+import os, re, string
 import sb.io, sb.cfg, sb.errors
 
 
@@ -6,6 +6,8 @@ import sb.io, sb.cfg, sb.errors
 FIELDS = ("id","mode","image","name","origin","version","info","parser",
     "output","bin","solc","cpu_quota","mem_limit","command","entrypoint")
 
+VAR_CONTRACT = re.compile(r"\$(CONTRACT\b|\{CONTRACT\})")
+
 class Tool():
 
     def __init__(self, cfg):
@@ -58,20 +60,25 @@ class Tool():
             self.absbin = os.path.join(sb.cfg.TOOLS_HOME,self.id,self.bin)
 
 
-    def command(self, filename, timeout, bin, main):
+    def command(self, filename, timeout, bin, main, contract):
         try:
-            return self._command.substitute(FILENAME=filename, TIMEOUT=timeout, BIN=bin, MAIN=main) if self._command else None
+            return self._command.substitute(FILENAME=filename, TIMEOUT=timeout, BIN=bin, MAIN=main, CONTRACT=contract) if self._command else None
         except KeyError as e:
             raise sb.errors.SmartBugsError(f"Unknown variable '{e}' in command of tool {self.id}/{self.mode}")
 
 
-    def entrypoint(self, filename, timeout, bin, main):
+    def entrypoint(self, filename, timeout, bin, main, contract):
         try:
-            return self._entrypoint.substitute(FILENAME=filename, TIMEOUT=timeout, BIN=bin, MAIN=main) if self._entrypoint else None
+            return self._entrypoint.substitute(FILENAME=filename, TIMEOUT=timeout, BIN=bin, MAIN=main, CONTRACT=contract) if self._entrypoint else None
         except KeyError as e:
             raise sb.errors.SmartBugsError(f"Unknown variable '{e}' in entrypoint of tool {self.id}/{self.mode}")
 
 
+    def splittable(self):
+        """Check whether the tool can analyse a single contract, passed via $CONTRACT."""
+        return any(VAR_CONTRACT.search(t.template) for t in (self._command, self._entrypoint) if t)
+
+
     def dict(self):
         d = {}
         for k,v in self.__dict__.items():
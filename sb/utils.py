@@ -1,3 +1,7 @@
+import time
+
+
+
 def str2label(s):
     """Convert string to label.
 
@@ -18,3 +22,37 @@ def str2label(s):
         else:
             separator = has_started
     return l
+
+
+
+class Phases:
+    """Durations of consecutive phases in seconds, by name; a phase ends when lap() is called."""
+
+    def __init__(self):
+        self.timings = {}
+        self.last = time.time()
+
+    def lap(self, phase):
+        now = time.time()
+        self.timings[phase] = self.timings.get(phase, 0.0) + now - self.last
+        self.last = now
+
+
+
+def mem2bytes(spec):
+    """Convert a memory specification like 512m or 4g (as for Docker's mem_limit) to bytes; None stays None."""
+    if spec is None:
+        return None
+    spec = str(spec).replace(" ","").lower()
+    units = { "k": 2**10, "m": 2**20, "g": 2**30 }
+    if spec[-1] in units:
+        return int(spec[:-1]) * units[spec[-1]]
+    return int(spec)
+
+
+def bytes2mem(n):
+    """Convert bytes to the largest unit of k, m and g that divides them."""
+    for unit,size in (("g", 2**30), ("m", 2**20), ("k", 2**10)):
+        if n % size == 0:
+            return f"{n//size}{unit}"
+    return str(n)
@@ -14,3 +14,24 @@ CREATE TABLE results (
     fails TEXT[],
     PRIMARY KEY (filename, toolid, toolmode, parser_version, runid)
 );
+
+CREATE TABLE findings (
+    filename TEXT,
+    toolid TEXT,
+    toolmode TEXT,
+    parser_version TEXT,
+    runid TEXT,
+    contract TEXT,
+    name TEXT,
+    function TEXT,
+    line INTEGER,
+    line_end INTEGER,
+    "column" INTEGER,
+    column_end INTEGER,
+    address BIGINT,
+    address_end BIGINT,
+    severity TEXT,
+    FOREIGN KEY (filename, toolid, toolmode, parser_version, runid) REFERENCES results ON DELETE CASCADE
+);
+CREATE INDEX findings_result ON findings (filename, toolid, toolmode, parser_version, runid);
+CREATE INDEX findings_name ON findings (name);
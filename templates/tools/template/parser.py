@@ -1,10 +1,12 @@
 import sb.parse_utils # for sb.parse_utils.init(...)
-import io, tarfile    # if the output parameter is used
 import ...            # any further imports
 
 VERSION: str = ...
 """identify the version of the parser, e.g. '2022/08/15'"""
 
+API: int = 2
+"""version of the parser interface; without it, parse receives log as list[str] and output as bytes|None"""
+
 FINDINGS: set[str]  = ...
 """set of strings: all possible findings, of which 'findings' below will be a subset"""
 
@@ -14,8 +16,10 @@ def parse(exit_code, log, output):
     Analyse the result of the tool tun.
 
     :param exit_code: int|None, exit code of Docker run (None=timeout)
-    :param log: list[str], stdout/stderr of Docker run
-    :param output: bytes, tar archive of files generated by the tool (if specified in config.yaml)
+    :param log: sb.parse_utils.LogLines, stdout/stderr of Docker run, read lazily;
+      iterate over it for the lines, use log.tail(n) for the last n lines and log.text() for the whole log
+    :param output: sb.parse_utils.Archive, tar archive of files generated by the tool (if specified in config.yaml);
+      false if there is no archive, output.open() returns a tarfile.TarFile
 
     :return: tuple[findings: list[dict], infos: set[str], errors: set[str], fails: set[str]]
       findings identifies the major observations of the tool,
@@ -34,7 +38,7 @@ def parse(exit_code, log, output):
         ...
 
     try:
-        with io.BytesIO(output) as o, tarfile.open(fileobj=o) as tar:
+        with output.open() as tar:
 
             # access specific file
             contents_of_some_file = tar.extractfile("name_of_some_file").read()
@@ -0,0 +1,71 @@
+import multiprocessing, unittest
+import sb.scheduler, sb.settings, sb.tasks, sb.tools
+
+
+
+def make_tools_settings():
+    tool = sb.tools.Tool({"id": "tool", "mode": "solidity", "image": "image", "command": "run $FILENAME"})
+    return [tool], sb.settings.Settings()
+
+
+def make_task(name, tool, settings):
+    return sb.tasks.Task(name, name, name, {}, None, f"results/{name}", None, None, None, None, None, tool, settings)
+
+
+def worker(taskqueue, feedback, seen, tools, settings):
+    # like an analyser: the first task runs out of memory and is reported back for a retry
+    sb.tasks.init(tools, settings)
+    while True:
+        task = taskqueue.get()
+        if task is None:
+            return
+        seen.put((task.absfn, task.mem_limit))
+        retry = None
+        if task.absfn == "oom.sol" and not task.mem_limit:
+            retry = make_task(task.absfn, task.tool, task.settings)
+            retry.mem_limit = 2**30
+        feedback.put((retry, -1))
+
+
+
+class TestScheduler(unittest.TestCase):
+
+    def test_priorities_and_cancel(self):
+        taskqueue = multiprocessing.get_context("spawn").Queue()
+        scheduler = sb.scheduler.Scheduler(taskqueue, 2)
+        for task,priority in ((1,5), (2,0), (3,5), (4,1)):
+            scheduler.add(task, priority)
+        self.assertEqual(scheduler.cancel(lambda t: t == 3), 1)
+        scheduler.start()
+        scheduler.join()
+        self.assertEqual([ taskqueue.get() for _ in range(5) ], [2, 4, 1, None, None])
+
+    def test_retry(self):
+        # the main process unpickles the retried task, so it needs the tools, too
+        tools,settings = make_tools_settings()
+        sb.tasks.init(tools, settings)
+        mp = multiprocessing.get_context("spawn")
+        taskqueue = mp.Queue(1)
+        feedback = mp.Queue()
+        seen = mp.Queue()
+        scheduler = sb.scheduler.Scheduler(taskqueue, 1, feedback)
+        for name in ("oom.sol", "ok.sol"):
+            scheduler.add(make_task(name, tools[0], settings))
+        p = mp.Process(target=worker, args=(taskqueue, feedback, seen, tools, settings))
+        p.start()
+        scheduler.start()
+        p.join(60)
+        self.assertEqual(p.exitcode, 0)
+        scheduler.dispatcher.join(10)
+        scheduler.collector.join(10)
+        self.assertFalse(scheduler.dispatcher.is_alive())
+        self.assertFalse(scheduler.collector.is_alive())
+        self.assertEqual(scheduler.in_flight, 0)
+        self.assertEqual(scheduler.pending(), 0)
+        self.assertEqual(sorted((seen.get(timeout=10) for _ in range(3)), key=lambda s: (s[0], s[1] or 0)),
+            [("ok.sol", None), ("oom.sol", None), ("oom.sol", 2**30)])
+
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -1,9 +1,8 @@
-import io
 import json
-import tarfile
 import sb.parse_utils
 
 VERSION = "2022/12/31"
+API = 2
 
 FINDINGS = {
     "Arbitrary Memory Access",
@@ -45,7 +44,7 @@ def parse(exit_code, log, output):
 
     if output:
         try:
-            with io.BytesIO(output) as o, tarfile.open(fileobj=o) as tar:
+            with output.open() as tar:
                 file = tar.extractfile("results.json")
                 results = json.load(file)
 
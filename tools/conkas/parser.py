@@ -2,6 +2,7 @@ import re
 import sb.parse_utils
 
 VERSION = "2022/11/11"
+API = 2
 
 FINDINGS = {
     "Integer Overflow",
@@ -27,6 +28,12 @@ ERRORS = (
 ANALYSING = re.compile("^Analysing (.*)\.\.\.$")
 VULNERABILITY = re.compile("^Vulnerability: (.*)\. Maybe in function: (.*)\. PC: 0x(.*)\. Line number: (.*)\.$")
 
+SCANNER = sb.parse_utils.Scanner(
+    ("error", ERRORS),
+    ("analysing", ANALYSING),
+    ("vulnerability", VULNERABILITY),
+)
+
 
 def is_relevant(line):
     return not ANALYSING.match(line)
@@ -47,22 +54,29 @@ def parse(exit_code, log, output):
             fails.add("exception (RecursionError: maximum recursion depth exceeded)")
 
     filename,contract = None,None
-    for line in log:
-        if sb.parse_utils.add_match(errors, line, ERRORS):
-            fails.discard("exception (Exception)")
-            continue
-        m = ANALYSING.match(line)
-        if m:
-            filename,contract = m[1].split(":") if ":" in m[1] else (m[1],None)
-        m = VULNERABILITY.match(line)
-        if m:
-            finding = { "name": m[1] }
-            if filename: finding["filename"] = filename
-            if contract: finding["contract"] = contract
-            if m[2]:     finding["function"] = m[2]
-            if m[3]:     finding["address"]  = int(m[3],16)
-            if m[4]:     finding["line"]   = int(m[4])
-            findings.append(finding)
+
+    def on_error(m):
+        errors.add(m[1])
+        fails.discard("exception (Exception)")
+
+    def on_analysing(m):
+        nonlocal filename, contract
+        filename,contract = m[1].split(":") if ":" in m[1] else (m[1],None)
+
+    def on_vulnerability(m):
+        finding = { "name": m[1] }
+        if filename: finding["filename"] = filename
+        if contract: finding["contract"] = contract
+        if m[2]:     finding["function"] = m[2]
+        if m[3]:     finding["address"]  = int(m[3],16)
+        if m[4]:     finding["line"]   = int(m[4])
+        findings.append(finding)
+
+    SCANNER.scan(log, {
+        "error": on_error,
+        "analysing": on_analysing,
+        "vulnerability": on_vulnerability,
+    })
 
     return findings, infos, errors, fails
 
@@ -9,7 +9,12 @@ chmod +x $BIN/solc
 
 CONTRACT="${FILENAME%.sol}"
 CONTRACT="${CONTRACT##*/}"
-CONTRACTS=$(python3 "$BIN"/printContractNames.py "$FILENAME")
+# list of contracts with deployed code, provided by SmartBugs or computed here
+if [ -f /sb/contractnames.txt ]; then
+    CONTRACTS=$(cat /sb/contractnames.txt)
+else
+    CONTRACTS=$(python3 "$BIN"/printContractNames.py "$FILENAME")
+fi
 
 OPT_CONTRACT=""
 if [ "$MAIN" -eq 1 ]; then
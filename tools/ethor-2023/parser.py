@@ -2,6 +2,7 @@ import re
 import sb.parse_utils
 
 VERSION = "2022/11/11"
+API = 2
 
 FINDINGS = ("secure", "insecure")
 
@@ -1,7 +1,8 @@
-import io, json, tarfile
+import json
 import sb.parse_utils
 
 VERSION = "2022/11/17"
+API = 2
 
 def parse(exit_code, log, output, FINDINGS):
     findings, infos = [], set()
@@ -13,7 +14,7 @@ def parse(exit_code, log, output, FINDINGS):
             fails.add("execution failed")
 
     try:
-        with io.BytesIO(output) as o, tarfile.open(fileobj=o) as tar:
+        with output.open() as tar:
             results_json=tar.extractfile("results.json").read()
         result = json.loads(results_json)
         for contract in result:
@@ -1,6 +1,7 @@
 import tools.gigahorse.parser as gigahorse
 
 VERSION = gigahorse.VERSION
+API = gigahorse.API
 
 FINDINGS = {
     "OverflowLoopIterator",
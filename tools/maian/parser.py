@@ -2,6 +2,7 @@ import sb.parse_utils
 import re
 
 VERSION = "2022/11/11"
+API = 2
 
 FINDINGS = (
     "No Ether leak (no send)",
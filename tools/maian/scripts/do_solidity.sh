@@ -3,13 +3,19 @@
 FILENAME="$1"
 BIN="$2"
 MAIN="$3"
+TARGET="$4" # single contract to analyse, when SmartBugs splits the file
 
 export PATH="$BIN:$PATH"
 chmod +x $BIN/solc
 
 CONTRACT="${FILENAME%.sol}"
 CONTRACT="${CONTRACT##*/}"
-CONTRACTS=$(python3 "$BIN"/printContractNames.py "$FILENAME")
+# list of contracts with deployed code, provided by SmartBugs or computed here
+if [ -f /sb/contractnames.txt ]; then
+    CONTRACTS=$(cat /sb/contractnames.txt)
+else
+    CONTRACTS=$(python3 "$BIN"/printContractNames.py "$FILENAME")
+fi
 
 if [ "$MAIN" -eq 1 ]; then
     if (echo "$CONTRACTS" | grep -q "$CONTRACT"); then
@@ -19,6 +25,9 @@ if [ "$MAIN" -eq 1 ]; then
         exit 127
     fi
 fi
+if [ -n "$TARGET" ]; then
+    CONTRACTS="$TARGET"
+fi
 
 cd /MAIAN/tool; 
 for CONTRACT in $CONTRACTS; do
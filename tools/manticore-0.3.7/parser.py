@@ -1,7 +1,8 @@
-import io, tarfile, yaml
+import yaml
 import sb.parse_utils
 
 VERSION = "2022/11/17"
+API = 2
 
 FINDINGS = set()
 
@@ -33,7 +34,7 @@ def parse(exit_code, log, output):
         errors.add("solc error")
 
     try:
-        with io.BytesIO(output) as o, tarfile.open(fileobj=o) as tar:
+        with output.open() as tar:
             for fn in tar.getnames():
                 if not fn.endswith("/global.findings"):
                     continue
@@ -2,13 +2,23 @@
 
 FILENAME="$1"
 BIN="$2"
+TARGET="$3" # single contract to analyse, when SmartBugs splits the file
 
 export PATH="$BIN:$PATH"
 chmod +x "$BIN/solc"
 
 mkdir /results
 
-for c in `python3 "$BIN/printContractNames.py" "${FILENAME}"`; do 
+# list of contracts with deployed code, provided by SmartBugs or computed here
+if [ -n "$TARGET" ]; then
+    CONTRACTS="$TARGET"
+elif [ -f /sb/contractnames.txt ]; then
+    CONTRACTS=$(cat /sb/contractnames.txt)
+else
+    CONTRACTS=$(python3 "$BIN/printContractNames.py" "${FILENAME}")
+fi
+
+for c in $CONTRACTS; do 
         manticore --no-colors --contract "${c}" "${FILENAME#/}"
         mv /mcore_* /results
 done
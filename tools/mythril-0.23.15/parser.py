@@ -2,6 +2,7 @@ import json
 import sb.parse_utils
 
 VERSION = "2023/01/20"
+API = 2
 
 FINDINGS = {
     "Jump to an arbitrary instruction (SWC 127)",
@@ -42,7 +43,7 @@ def parse(exit_code, log, output):
                 break
 
     try:
-        result = json.loads(log[-1])
+        result = json.loads(log.tail(1)[0])
     except:
         result = None
     if result:
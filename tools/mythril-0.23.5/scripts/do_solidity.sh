@@ -4,13 +4,19 @@ FILENAME="$1"
 TIMEOUT="$2"
 BIN="$3"
 MAIN="$4"
+TARGET="$5" # single contract to analyse, when SmartBugs splits the file
 
 export PATH="$BIN:$PATH"
 chmod +x "$BIN/solc"
 
 CONTRACT="${FILENAME%.sol}"
 CONTRACT="${CONTRACT##*/}"
-CONTRACTS=$(python3 "$BIN"/printContractNames.py "$FILENAME")
+# list of contracts with deployed code, provided by SmartBugs or computed here
+if [ -f /sb/contractnames.txt ]; then
+    CONTRACTS=$(cat /sb/contractnames.txt)
+else
+    CONTRACTS=$(python3 "$BIN"/printContractNames.py "$FILENAME")
+fi
 
 OPT_CONTRACT=""
 if [ "$MAIN" -eq 1 ]; then
@@ -21,6 +27,9 @@ if [ "$MAIN" -eq 1 ]; then
         exit 127
     fi
 fi
+if [ -n "$TARGET" ]; then
+    OPT_CONTRACT=":$TARGET"
+fi
 
 OPT_TIMEOUT=""
 if [ "$TIMEOUT" -gt 0 ]; then
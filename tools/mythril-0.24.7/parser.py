@@ -2,6 +2,7 @@ import json
 import sb.parse_utils
 
 VERSION = "2024/03/24"
+API = 2
 
 FINDINGS = {
     "Jump to an arbitrary instruction (SWC 127)",
@@ -45,7 +46,7 @@ def parse(exit_code, log, output):
                 break
 
     try:
-        result = json.loads(log[-1])
+        result = json.loads(log.tail(1)[0])
     except:
         result = None
     if result:
@@ -1,33 +1,42 @@
-import sys, json
+import sys, json, os
 from subprocess import PIPE, Popen
 
 filename = sys.argv[1]
-cmd = ["solc", "--standard-json", "--allow-paths", ".,/"]
-settings = {
-    "optimizer": {"enabled": False},
-    "outputSelection": {
-        "*": {
-            "*": [ "evm.deployedBytecode" ],
-        }
-    },
-}
 
-input_json = json.dumps(
-    {
-        "language": "Solidity",
-        "sources": {filename: {"urls": [filename]}},
-        "settings": settings,
+# SmartBugs may provide the compiler output, when compiling on the host
+precompiled = "/sb/solc.json"
+if os.path.isfile(precompiled):
+    with open(precompiled) as f:
+        result = json.load(f)
+    unit = os.path.relpath(filename, os.path.dirname(precompiled))
+else:
+    cmd = ["solc", "--standard-json", "--allow-paths", ".,/"]
+    settings = {
+        "optimizer": {"enabled": False},
+        "outputSelection": {
+            "*": {
+                "*": [ "evm.deployedBytecode" ],
+            }
+        },
     }
-)
-p = Popen(cmd, stdin=PIPE, stdout=PIPE, stderr=PIPE)
-stdout, stderr = p.communicate(bytes(input_json, "utf8"))
-out = stdout.decode("UTF-8")
-result = json.loads(out)
+
+    input_json = json.dumps(
+        {
+            "language": "Solidity",
+            "sources": {filename: {"urls": [filename]}},
+            "settings": settings,
+        }
+    )
+    p = Popen(cmd, stdin=PIPE, stdout=PIPE, stderr=PIPE)
+    stdout, stderr = p.communicate(bytes(input_json, "utf8"))
+    out = stdout.decode("UTF-8")
+    result = json.loads(out)
+    unit = filename
 for error in result.get("errors", []):
     if error["severity"] == "error":
         print(error["formattedMessage"])
         sys.exit(1)
-contracts = result["contracts"][filename]
+contracts = result["contracts"][unit]
 for contract in contracts.keys():
     if len(contracts[contract]["evm"]["deployedBytecode"]["object"]):
         print(contract)
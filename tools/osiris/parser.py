@@ -1,6 +1,7 @@
 import tools.oyente.parser as oyente
 
 VERSION = oyente.VERSION
+API = oyente.API
 
 FINDINGS = {
 #    "Arithmetic bugs", # redundant, a sub-category will be reported anyway
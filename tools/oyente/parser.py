@@ -2,6 +2,7 @@ import re
 import sb.parse_utils
 
 VERSION = "2023/02/27"
+API = 2
 
 FINDINGS = {
     "Callstack Depth Attack Vulnerability",
@@ -34,6 +35,17 @@ LOCATION1 = re.compile("^INFO:symExec:([^:]*):([0-9]+):([0-9]+):\s*([^:]*):\s*(.
 LOCATION2 = re.compile("^([^:]*):([^:]*):([0-9]+):([0-9]+)") # Osiris
 COMPLETED = re.compile("^INFO:symExec:\s*====== Analysis Completed ======")
 
+SCANNER = sb.parse_utils.Scanner(
+    ("info", INFOS),
+    ("error", ERRORS),
+    ("fail", FAILS),
+    ("contract", CONTRACT),
+    ("weakness", WEAKNESS),
+    ("location1", LOCATION1),
+    ("location2", LOCATION2),
+    ("completed", COMPLETED),
+)
+
 
 def is_relevant(line):
     # Identify lines interfering with exception parsing
@@ -55,48 +67,46 @@ def parse(exit_code, log, output):
     analysis_completed = False
     filename,contract,weakness = None,None,None
     weaknesses = set()
-    for line in log:
-        if sb.parse_utils.add_match(infos, line, INFOS):
-            continue
-        if sb.parse_utils.add_match(errors, line, ERRORS):
-            continue
-        if sb.parse_utils.add_match(fails, line, FAILS):
-            continue
-
-        m = CONTRACT.match(line)
-        if m:
-            filename, contract = m[1], m[2]
-            analysis_completed = False
-            continue
-
-        m = WEAKNESS.match(line)
-        if m:
-            weakness = m[1]
-            if weakness == "Arithmetic bugs":
-                # Osiris: superfluous, will also report a sub-category
-                continue
-            weaknesses.add((filename,contract,weakness,None,None))
-            continue
-
-        m = LOCATION1.match(line)
-        if m:
-            fn, lineno, column, severity, weakness = m[1], m[2], m[3], m[4], m[5]
-            weaknesses.discard((filename,contract,weakness,None,None))
-            weaknesses.add((filename,contract,weakness,int(lineno),int(column)))
-            continue
-
-        m = LOCATION2.match(line)
-        if m:
-            fn, ct, lineno, column = m[1], m[2], m[3], m[4]
-            assert fn == filename and ct == contract and weakness is not None
-            weaknesses.discard((filename,contract,weakness,None,None))
-            weaknesses.add((filename,contract,weakness,int(lineno),int(column)))
-            continue
-
-        m = COMPLETED.match(line)
-        if m:
-            analysis_completed = True
-            continue
+
+    def on_contract(m):
+        nonlocal filename, contract, analysis_completed
+        filename, contract = m[1], m[2]
+        analysis_completed = False
+
+    def on_weakness(m):
+        nonlocal weakness
+        weakness = m[1]
+        if weakness == "Arithmetic bugs":
+            # Osiris: superfluous, will also report a sub-category
+            return
+        weaknesses.add((filename,contract,weakness,None,None))
+
+    def on_location1(m):
+        nonlocal weakness
+        fn, lineno, column, severity, weakness = m[1], m[2], m[3], m[4], m[5]
+        weaknesses.discard((filename,contract,weakness,None,None))
+        weaknesses.add((filename,contract,weakness,int(lineno),int(column)))
+
+    def on_location2(m):
+        fn, ct, lineno, column = m[1], m[2], m[3], m[4]
+        assert fn == filename and ct == contract and weakness is not None
+        weaknesses.discard((filename,contract,weakness,None,None))
+        weaknesses.add((filename,contract,weakness,int(lineno),int(column)))
+
+    def on_completed(m):
+        nonlocal analysis_completed
+        analysis_completed = True
+
+    SCANNER.scan(log, {
+        "info": lambda m: infos.add(m[1]),
+        "error": lambda m: errors.add(m[1]),
+        "fail": lambda m: fails.add(m[1]),
+        "contract": on_contract,
+        "weakness": on_weakness,
+        "location1": on_location1,
+        "location2": on_location2,
+        "completed": on_completed,
+    })
 
     for filename,contract,weakness,lineno,column in sorted(weaknesses):
         finding = { "name": weakness }
@@ -2,6 +2,7 @@ import re, ast
 import sb.parse_utils
 
 VERSION = "2023/02/27"
+API = 2
     
 FINDINGS = {
     "delegatecall bug",
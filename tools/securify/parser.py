@@ -1,7 +1,8 @@
-import json, io, tarfile
+import json
 import sb.parse_utils
 
-VERSION = "2022/11/17"
+VERSION = "2026/10/19"
+API = 2
 
 FINDINGS = {
     "DAO",
@@ -26,9 +27,9 @@ def parse(exit_code, log, output):
     # - output:results/live.json
     try:
         try:
-            analysis = json.loads(log)
+            analysis = json.loads(log.text())
         except:
-            with io.BytesIO(output) as o, tarfile.open(fileobj=o) as tar:
+            with output.open() as tar:
                 try:
                     jsn = tar.extractfile("results/results.json").read()
                     analysis = json.loads(jsn)
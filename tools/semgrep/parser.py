@@ -2,6 +2,7 @@ import sb.parse_utils, sb.cfg# for sb.parse_utils.init(...)
 import re
 
 VERSION: str = "2023/08/21"
+API: int = 2
 
 FINDINGS = [
     "unnecessary-checked-arithmetic-in-loop",
@@ -1,12 +1,11 @@
-import io
 import json
 import os
 import re
-import tarfile
 
 import sb.parse_utils
 
 VERSION = "2023/03/02"
+API = 2
 
 FINDINGS = {
     "Block Number Dependency",
@@ -32,7 +31,7 @@ def parse(exit_code, log, output):
             # file structure:
             # stats: contracts/<contract_name>.sol:<contract_name>/stats.csv
             # vulnerabilities: contracts/<contract_name>.sol:<contract_name>/<finding_name>.json
-            with io.BytesIO(output) as o, tarfile.open(fileobj=o) as tar:
+            with output.open() as tar:
                 for member in tar.getmembers():
                     if member.name.endswith(STATS_FILENAME):
                         stats = tar.extractfile(member)
@@ -1,7 +1,8 @@
-import io, tarfile, json, re
+import json, re
 import sb.parse_utils
 
 VERSION = "2024/04/30"
+API = 2
 
 FINDINGS = {
     "abiencoderv2-array",
@@ -110,7 +111,7 @@ def parse(exit_code, log, output):
     errors.discard('EXIT_CODE_255') # this code seems to be returned in any case
 
     try:
-        with io.BytesIO(output) as o, tarfile.open(fileobj=o) as tar:
+        with output.open() as tar:
             output_json = tar.extractfile("output.json").read()
             output_dict = json.loads(output_json)
     except Exception as e:
@@ -7,4 +7,9 @@ BIN="$3"
 export PATH="$BIN:$PATH"
 chmod +x "$BIN/solc"
 
-slither "$FILENAME" --json /output.json
+# locations of imported files in /sb, provided by SmartBugs
+if [ -f /sb/remappings.txt ]; then
+    slither "$FILENAME" --solc-remaps "$(echo $(cat /sb/remappings.txt))" --solc-args "--allow-paths /sb" --json /output.json
+else
+    slither "$FILENAME" --json /output.json
+fi
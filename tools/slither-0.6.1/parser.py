@@ -1,7 +1,8 @@
-import io, tarfile, json, re
+import json, re
 import sb.parse_utils
 
 VERSION = "2022/11/14"
+API = 2
 
 FINDINGS = {
     "abiencoderv2-array",
@@ -101,7 +102,7 @@ def parse(exit_code, log, output):
     #    pass
 
     try:
-        with io.BytesIO(output) as o, tarfile.open(fileobj=o) as tar:
+        with output.open() as tar:
             output_json = tar.extractfile("output.json").read()
             issues = json.loads(output_json)
     except Exception as e:
@@ -1,6 +1,7 @@
 import sb.parse_utils
 
 VERSION = "2022/11/14"
+API = 2
 
 FINDINGS = {
     "array-declaration-spaces",
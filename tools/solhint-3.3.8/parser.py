@@ -1,6 +1,7 @@
 import sb.parse_utils
 
 VERSION = "2023/02/12"
+API = 2
 
 FINDINGS = {
     "array-declaration-spaces",
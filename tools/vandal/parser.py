@@ -1,7 +1,8 @@
-import io, os, tarfile
+import os
 import sb.parse_utils
 
 VERSION = "2023/02/27"
+API = 2
 
 FINDINGS = (
     "CheckedCallStateUpdate",
@@ -57,7 +58,7 @@ def parse(exit_code, log, output):
 
     if output:
         try:
-            with io.BytesIO(output) as o, tarfile.open(fileobj=o) as tar:
+            with output.open() as tar:
                 for fn in tar.getnames():
                     if not fn.endswith(".csv"):
                         continue